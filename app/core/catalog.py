@@ -0,0 +1,393 @@
+from __future__ import annotations
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from app.deps import CATALOG_PATH, PDF_DIR, STORE_DIR, INDEX_DIR
+
+PENDING, PARSING, INDEXING, READY, FAILED = "pending", "parsing", "indexing", "ready", "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id        TEXT PRIMARY KEY,
+    filename      TEXT,
+    status        TEXT NOT NULL,
+    error         TEXT,
+    pages         INTEGER,
+    n_blocks      INTEGER,
+    n_chunks      INTEGER,
+    embed_model   TEXT,
+    embed_dim     INTEGER,
+    embed_backend TEXT,
+    rerank_model  TEXT,
+    parent_doc_id TEXT,
+    similarity    REAL,
+    reused_chunks INTEGER,
+    embedded_chunks INTEGER,
+    bytes         TEXT NOT NULL DEFAULT '{}',
+    timings       TEXT NOT NULL DEFAULT '{}',
+    created_at    REAL NOT NULL,
+    updated_at    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_status ON documents(status);
+CREATE TABLE IF NOT EXISTS signatures (
+    doc_id        TEXT PRIMARY KEY,
+    signature     BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lsh_buckets (
+    band          INTEGER NOT NULL,
+    bucket        TEXT NOT NULL,
+    doc_id        TEXT NOT NULL,
+    PRIMARY KEY (band, bucket, doc_id)
+);
+CREATE INDEX IF NOT EXISTS lsh_buckets_doc ON lsh_buckets(doc_id);
+"""
+# columns added after the first release; ALTERed into older databases on open
+_ADDED_COLUMNS = {
+    "embed_backend": "TEXT",
+    "parent_doc_id": "TEXT",
+    "similarity": "REAL",
+    "reused_chunks": "INTEGER",
+    "embedded_chunks": "INTEGER",
+}
+_JSON_COLUMNS = ("bytes", "timings")
+_COLUMNS = (
+    "filename", "status", "error", "pages", "n_blocks", "n_chunks",
+    "embed_model", "embed_dim", "embed_backend", "rerank_model", "bytes", "timings",
+    "parent_doc_id", "similarity", "reused_chunks", "embedded_chunks",
+)
+
+
+def artifact_paths(doc_id: str) -> Dict[str, Path]:
+    """Every file an ingest can leave behind for `doc_id`, keyed by artifact kind."""
+    return {
+        "pdf": PDF_DIR / f"{doc_id}.pdf",
+        "blocks": STORE_DIR / f"{doc_id}.blocks.jsonl",
+        "chunks": STORE_DIR / f"{doc_id}.chunks.jsonl",
+        "index": INDEX_DIR / f"{doc_id}.faiss",
+        "meta": INDEX_DIR / f"{doc_id}.meta.json",
+        "vectors": INDEX_DIR / f"{doc_id}.vecs.npy",
+        "rows": INDEX_DIR / f"{doc_id}.rows.jsonl",
+        "row_offsets": INDEX_DIR / f"{doc_id}.rows.idx.npy",
+    }
+
+
+# artifacts /ask and /extract need, as alternative complete sets (mmap'd with
+# INDEX_MMAP=1, faiss otherwise or for older docs); the rest are ingest intermediates
+REQUIRED_ARTIFACTS = (("vectors", "rows", "row_offsets"), ("index", "meta"))
+
+
+def artifact_sizes(doc_id: str) -> Dict[str, int]:
+    return {k: p.stat().st_size for k, p in artifact_paths(doc_id).items() if p.exists()}
+
+
+def remove_artifacts(doc_id: str, keep: tuple = ()) -> int:
+    """Delete a document's files; returns bytes freed."""
+    freed = 0
+    for kind, path in artifact_paths(doc_id).items():
+        if kind in keep:
+            continue
+        try:
+            freed += path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            pass
+    return freed
+
+
+def _doc_id_of(path: Path) -> str:
+    return path.name.split(".", 1)[0]
+
+
+class Catalog:
+    """
+    SQLite record of every document: ingest status, counts, model versions,
+    artifact sizes and per-stage timings. Connections are short-lived and the
+    database runs in WAL mode so several workers can read while one writes.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fresh = not self.path.exists()
+        with self._conn() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            have = {r["name"] for r in conn.execute("PRAGMA table_info(documents)")}
+            for col, kind in _ADDED_COLUMNS.items():
+                if col not in have:
+                    conn.execute(f"ALTER TABLE documents ADD COLUMN {col} {kind}")
+        if fresh:
+            self.adopt_untracked()
+
+    @contextmanager
+    def _conn(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:  # commit on success, roll back on error
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row(row: Optional[sqlite3.Row]) -> Optional[dict]:
+        if row is None:
+            return None
+        rec = dict(row)
+        for col in _JSON_COLUMNS:
+            rec[col] = json.loads(rec.get(col) or "{}")
+        return rec
+
+    # ------------------------- reads -------------------------
+
+    def get(self, doc_id: str) -> Optional[dict]:
+        with self._conn() as conn:
+            row = conn.execute("SELECT * FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+        return self._row(row)
+
+    def list(self, status: Optional[str] = None) -> List[dict]:
+        sql = "SELECT * FROM documents"
+        args: tuple = ()
+        if status:
+            sql += " WHERE status = ?"
+            args = (status,)
+        with self._conn() as conn:
+            rows = conn.execute(sql + " ORDER BY created_at DESC", args).fetchall()
+        return [self._row(r) for r in rows]
+
+    def is_ready(self, doc_id: str) -> bool:
+        with self._conn() as conn:
+            row = conn.execute("SELECT status FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+        return row is not None and row["status"] == READY
+
+    def versions(self, doc_id: str) -> List[dict]:
+        """Every document linked to `doc_id` through parent_doc_id, oldest first."""
+        with self._conn() as conn:
+            # up to the oldest ancestor still in the catalog (parents may have been deleted)
+            root, seen = doc_id, {doc_id}
+            while True:
+                row = conn.execute("SELECT parent_doc_id FROM documents WHERE doc_id = ?", (root,)).fetchone()
+                parent = row["parent_doc_id"] if row is not None else None
+                if not parent or parent in seen or not conn.execute(
+                        "SELECT 1 FROM documents WHERE doc_id = ?", (parent,)).fetchone():
+                    break
+                root = parent
+                seen.add(root)
+            # then down through every descendant
+            found: Dict[str, sqlite3.Row] = {}
+            frontier = [root]
+            while frontier:
+                marks = ", ".join("?" * len(frontier))
+                rows = conn.execute(
+                    f"SELECT * FROM documents WHERE doc_id IN ({marks}) OR parent_doc_id IN ({marks})",
+                    (*frontier, *frontier)).fetchall()
+                new = {r["doc_id"]: r for r in rows if r["doc_id"] not in found}
+                found.update(new)
+                frontier = list(new)
+        return sorted((self._row(r) for r in found.values()), key=lambda r: r["created_at"])
+
+    def near_duplicates(self, keys: List[str], exclude: str = "") -> Dict[str, bytes]:
+        """Signatures of ready documents sharing at least one LSH bucket with `keys`."""
+        if not keys:
+            return {}
+        clauses = " OR ".join("(b.band = ? AND b.bucket = ?)" for _ in keys)
+        args = [x for band, key in enumerate(keys) for x in (band, key)]
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT s.doc_id, s.signature FROM lsh_buckets b"
+                " JOIN signatures s ON s.doc_id = b.doc_id"
+                " JOIN documents d ON d.doc_id = b.doc_id"
+                f" WHERE ({clauses}) AND d.status = ? AND d.doc_id != ?",
+                (*args, READY, exclude)).fetchall()
+        return {r["doc_id"]: bytes(r["signature"]) for r in rows}
+
+    # ------------------------- writes -------------------------
+
+    def upsert(self, doc_id: str, **fields) -> None:
+        """Insert or update a document row; JSON columns are merged, not replaced."""
+        unknown = set(fields) - set(_COLUMNS)
+        if unknown:
+            raise ValueError(f"unknown catalog columns: {sorted(unknown)}")
+        now = time.time()
+        with self._conn() as conn:
+            row = conn.execute("SELECT * FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+            current = self._row(row) or {}
+            for col in _JSON_COLUMNS:
+                if col in fields:
+                    fields[col] = json.dumps({**current.get(col, {}), **fields[col]})
+            if row is None:
+                fields.setdefault("status", PENDING)
+                cols = ["doc_id", *fields, "created_at", "updated_at"]
+                conn.execute(
+                    f"INSERT INTO documents ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))})",
+                    (doc_id, *fields.values(), now, now),
+                )
+            else:
+                sets = ", ".join(f"{c} = ?" for c in fields)
+                conn.execute(
+                    f"UPDATE documents SET {sets}{', ' if sets else ''}updated_at = ? WHERE doc_id = ?",
+                    (*fields.values(), now, doc_id),
+                )
+
+    def begin(self, doc_id: str, filename: str, stale_after: float = 3600.0) -> Optional[dict]:
+        """
+        Start (or restart) an ingest: previous counts and timings are cleared.
+        Returns None once the ingest is claimed, or the existing row if the doc
+        is already ready or being ingested by another request (updated within
+        `stale_after` seconds); that row is left untouched.
+        """
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("BEGIN IMMEDIATE")  # check-and-claim must not interleave across workers
+            row = self._row(conn.execute("SELECT * FROM documents WHERE doc_id = ?", (doc_id,)).fetchone())
+            if row is not None and (row["status"] == READY or (
+                    row["status"] != FAILED and now - row["updated_at"] <= stale_after)):
+                return row
+            conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+            conn.execute(
+                "INSERT INTO documents (doc_id, filename, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (doc_id, filename, PARSING, now, now),
+            )
+        return None
+
+    def put_signature(self, doc_id: str, signature: bytes, keys: List[str]) -> None:
+        """Store a document's MinHash signature and its LSH band buckets."""
+        with self._conn() as conn:
+            conn.execute("DELETE FROM lsh_buckets WHERE doc_id = ?", (doc_id,))
+            conn.execute("INSERT OR REPLACE INTO signatures (doc_id, signature) VALUES (?, ?)",
+                         (doc_id, signature))
+            conn.executemany("INSERT OR IGNORE INTO lsh_buckets (band, bucket, doc_id) VALUES (?, ?, ?)",
+                             [(band, key, doc_id) for band, key in enumerate(keys)])
+
+    def fail(self, doc_id: str, error: str) -> None:
+        self.upsert(doc_id, status=FAILED, error=error[:2000])
+
+    def delete(self, doc_id: str) -> bool:
+        with self._conn() as conn:
+            conn.execute("DELETE FROM lsh_buckets WHERE doc_id = ?", (doc_id,))
+            conn.execute("DELETE FROM signatures WHERE doc_id = ?", (doc_id,))
+            cur = conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+        return cur.rowcount > 0
+
+    # ------------------------- maintenance -------------------------
+
+    def _artifact_doc_ids(self) -> set:
+        ids = set()
+        for d in {PDF_DIR, STORE_DIR, INDEX_DIR}:
+            for p in d.iterdir():
+                if p.is_file() and not p.name.startswith("."):
+                    ids.add(_doc_id_of(p))
+        return ids
+
+    def _complete(self, doc_id: str) -> bool:
+        paths = artifact_paths(doc_id)
+        return any(all(paths[k].exists() for k in kinds) for kinds in REQUIRED_ARTIFACTS)
+
+    def adopt_untracked(self) -> List[str]:
+        """Register complete artifact sets that predate the catalog as ready documents."""
+        adopted = []
+        for doc_id in sorted(self._artifact_doc_ids()):
+            if self.get(doc_id) is not None or not self._complete(doc_id):
+                continue
+            paths = artifact_paths(doc_id)
+            try:
+                if paths["row_offsets"].exists():
+                    n_chunks = len(np.load(paths["row_offsets"], mmap_mode="r")) - 1
+                else:
+                    n_chunks = int(json.loads(paths["meta"].read_text()).get("n", 0))
+            except Exception:
+                continue
+            self.upsert(doc_id, status=READY, n_chunks=n_chunks, bytes=artifact_sizes(doc_id))
+            adopted.append(doc_id)
+        return adopted
+
+    @staticmethod
+    def _purgeable(rec: dict, now: float, stale_after: float) -> bool:
+        return rec["status"] == FAILED or (rec["status"] != READY and now - rec["updated_at"] > stale_after)
+
+    # gc works from a snapshot, and an ingest may claim a doc_id (Catalog.begin) after it
+    # was taken; each removal re-checks the row inside BEGIN IMMEDIATE, which also holds
+    # off begin() until the files are gone
+
+    def _remove_orphan(self, doc_id: str) -> Optional[int]:
+        """Delete an untracked doc's files; None if an ingest has claimed it since the scan."""
+        with self._conn() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM documents WHERE doc_id = ?", (doc_id,)).fetchone():
+                return None
+            return remove_artifacts(doc_id)
+
+    def _purge(self, doc_id: str, now: float, stale_after: float) -> Optional[int]:
+        """Delete a failed or stale doc and its files; None if it was restarted since the scan."""
+        with self._conn() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rec = conn.execute("SELECT status, updated_at FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+            if rec is None or not self._purgeable(dict(rec), now, stale_after):
+                return None
+            freed = remove_artifacts(doc_id)
+            conn.execute("DELETE FROM lsh_buckets WHERE doc_id = ?", (doc_id,))
+            conn.execute("DELETE FROM signatures WHERE doc_id = ?", (doc_id,))
+            conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+        return freed
+
+    def gc(self, stale_after: float = 3600.0, dry_run: bool = False) -> dict:
+        """
+        Reconcile the catalog with the filesystem:
+        - untracked but complete artifact sets are adopted;
+        - untracked incomplete sets (orphans of crashed ingests) are deleted;
+        - failed rows, and in-progress rows idle for `stale_after` seconds,
+          are purged together with their files;
+        - ready rows whose required artifacts vanished are marked failed.
+        """
+        report = {"adopted": [], "orphans_removed": [], "purged": [], "marked_failed": [], "freed_bytes": 0}
+        if not dry_run:
+            report["adopted"] = self.adopt_untracked()
+
+        known = {r["doc_id"]: r for r in self.list()}
+        for doc_id in sorted(self._artifact_doc_ids() - set(known)):
+            if dry_run:
+                if not self._complete(doc_id):
+                    report["orphans_removed"].append(doc_id)
+                continue
+            freed = self._remove_orphan(doc_id)
+            if freed is not None:
+                report["orphans_removed"].append(doc_id)
+                report["freed_bytes"] += freed
+
+        now = time.time()
+        for doc_id, rec in known.items():
+            status = rec["status"]
+            if self._purgeable(rec, now, stale_after):
+                if dry_run:
+                    report["purged"].append(doc_id)
+                    continue
+                freed = self._purge(doc_id, now, stale_after)
+                if freed is not None:
+                    report["purged"].append(doc_id)
+                    report["freed_bytes"] += freed
+            elif status == READY and not self._complete(doc_id):
+                report["marked_failed"].append(doc_id)
+                if not dry_run:
+                    self.fail(doc_id, "missing artifacts: no complete index (" + " or ".join(
+                        "+".join(kinds) for kinds in REQUIRED_ARTIFACTS) + ")")
+        return report
+
+
+_catalog: Optional[Catalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> Catalog:
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = Catalog(CATALOG_PATH)
+    return _catalog
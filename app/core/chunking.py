@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import List
+from typing import Dict, List, Optional
 from dataclasses import dataclass
 import json
 from pathlib import Path
@@ -13,7 +13,36 @@ class Chunk:
     block_ids: List[str]
 
 
-def chunk_blocks(blocks: List[dict], doc_id: str, out_path: Path, max_chars: int = 1800) -> List[Chunk]:
+def _anchor_index(anchors: List[str]) -> Dict[str, List[str]]:
+    """Anchor chunk texts keyed by their first line, longest first."""
+    index: Dict[str, List[str]] = {}
+    for text in sorted(set(anchors), key=len, reverse=True):
+        index.setdefault(text.split("\n", 1)[0], []).append(text)
+    return index
+
+
+def _match_anchor(texts: List[str], i: int, index: Dict[str, List[str]]) -> Optional[tuple]:
+    """(anchor text, blocks consumed) if texts[i:i+k] joined by newlines equals an anchor."""
+    for anchor in index.get(texts[i].split("\n", 1)[0], ()):
+        acc, k = texts[i], 1
+        while len(acc) < len(anchor) and i + k < len(texts) and anchor.startswith(acc + "\n"):
+            acc += "\n" + texts[i + k]
+            k += 1
+        if acc == anchor:
+            return anchor, k
+    return None
+
+
+def chunk_blocks(blocks: List[dict], doc_id: str, out_path: Path, max_chars: int = 1800,
+                 anchors: Optional[List[str]] = None) -> List[Chunk]:
+    """
+    Pack blocks into chunks of up to `max_chars`; tables are chunks of their own.
+
+    `anchors` are the chunk texts of an earlier version of the same paper. Any
+    run of blocks that reproduces one of them becomes that chunk again and only
+    the blocks in between are packed greedily, so chunk boundaries resync right
+    after an edit instead of shifting for the rest of the document.
+    """
     chunks: List[Chunk] = []
     cur_text, cur_pages, cur_blocks = [], set(), []
 
@@ -32,11 +61,31 @@ def chunk_blocks(blocks: List[dict], doc_id: str, out_path: Path, max_chars: int
         chunks.append(chunk)
         cur_text, cur_pages, cur_blocks = [], set(), []
 
-    for b in blocks:
-        kind = b.get("kind")
-        txt = b.get("text", "").strip()
-        if not txt:
+    items = [(b, b.get("text", "").strip()) for b in blocks]
+    items = [(b, txt) for b, txt in items if txt]
+    texts = [txt for _, txt in items]
+    index = _anchor_index(anchors) if anchors else {}
+    i = 0
+    while i < len(items):
+        match = _match_anchor(texts, i, index) if index else None
+        if match is not None:
+            text, k = match
+            flush()
+            run = [b for b, _ in items[i:i + k]]
+            chunks.append(
+                Chunk(
+                    chunk_id=f"{doc_id}:{len(chunks)}",
+                    doc_id=doc_id,
+                    pages=sorted({b.get("page") for b in run}),
+                    text=text,
+                    block_ids=[b.get("id") for b in run],
+                )
+            )
+            i += k
             continue
+        b, txt = items[i]
+        i += 1
+        kind = b.get("kind")
         if kind == "table":
             flush()
             cid = f"{doc_id}:{len(chunks)}"
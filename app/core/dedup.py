@@ -0,0 +1,86 @@
+"""
+Near-duplicate detection for ingest.
+
+The doc_id is the MD5 of the uploaded bytes, so a re-download, an arXiv v2 or
+a camera-ready copy is a new document even when almost all of its text is
+unchanged. At ingest every paper gets a MinHash signature over the word
+shingles of its parsed block text; the signature is split into LSH bands that are
+stored in the catalog, so finding candidates is a handful of indexed lookups
+instead of a scan over every paper.
+
+A candidate whose estimated Jaccard similarity reaches DEDUP_THRESHOLD becomes
+the new document's parent. Its chunks anchor the new document's chunking (see
+`chunk_blocks`), so unchanged text chunks identically; those chunks keep the
+parent's vector, and only the rest are embedded.
+"""
+from __future__ import annotations
+import hashlib
+import re
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.deps import DEDUP_THRESHOLD, DEDUP_NUM_PERM, DEDUP_BANDS, DEDUP_SHINGLE
+
+_PRIME = (1 << 31) - 1  # a*x + b stays below 2**63 for 32-bit x
+_WORD = re.compile(r"\w+")
+
+
+def _permutations(num_perm: int, seed: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    rng = np.random.RandomState(seed)  # fixed: signatures are persisted and compared across runs
+    a = rng.randint(1, _PRIME, size=num_perm, dtype=np.int64).astype(np.uint64)
+    b = rng.randint(0, _PRIME, size=num_perm, dtype=np.int64).astype(np.uint64)
+    return a, b
+
+
+_A, _B = _permutations(DEDUP_NUM_PERM)
+
+
+def shingles(texts: Iterable[str], k: int = DEDUP_SHINGLE) -> np.ndarray:
+    """32-bit hashes of the distinct k-word shingles of `texts` (case and punctuation folded)."""
+    out = set()
+    for text in texts:
+        words = _WORD.findall(text.lower())
+        if len(words) < k:
+            if words:
+                out.add(zlib.crc32(" ".join(words).encode("utf-8")))
+            continue
+        for i in range(len(words) - k + 1):
+            out.add(zlib.crc32(" ".join(words[i:i + k]).encode("utf-8")))
+    return np.fromiter(out, dtype=np.uint64, count=len(out))
+
+
+def signature(texts: Iterable[str]) -> Optional[np.ndarray]:
+    """MinHash signature (uint32[DEDUP_NUM_PERM]) of a document's texts; None if it has no words."""
+    x = shingles(texts)
+    if not len(x):
+        return None
+    sig = np.full(len(_A), _PRIME, dtype=np.uint64)
+    for start in range(0, len(x), 4096):  # bounds the (perm x shingle) temporary
+        block = x[start:start + 4096]
+        np.minimum(sig, ((np.outer(_A, block) + _B[:, None]) % _PRIME).min(axis=1), out=sig)
+    return sig.astype(np.uint32)
+
+
+def band_keys(sig: np.ndarray, bands: int = DEDUP_BANDS) -> List[str]:
+    """One bucket key per LSH band; papers sharing any key are candidates."""
+    rows = len(sig) // bands
+    return [hashlib.blake2b(sig[i * rows:(i + 1) * rows].tobytes(), digest_size=8).hexdigest()
+            for i in range(bands)]
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the two shingle sets."""
+    return float(np.mean(a == b)) if len(a) == len(b) else 0.0
+
+
+def best_match(sig: np.ndarray, candidates: Dict[str, bytes],
+               threshold: float = DEDUP_THRESHOLD) -> Optional[Tuple[str, float]]:
+    """(doc_id, similarity) of the closest candidate at or above `threshold`, else None."""
+    best = None
+    for doc_id, blob in candidates.items():
+        sim = similarity(sig, np.frombuffer(blob, dtype=np.uint32))
+        if sim >= threshold and (best is None or sim > best[1]):
+            best = (doc_id, sim)
+    return best
@@ -1,12 +1,92 @@
-import faiss, json
+import faiss, json, mmap, os, threading
 import numpy as np
+from collections import OrderedDict
 from pathlib import Path
-from sentence_transformers import SentenceTransformer
-from typing import List
+from typing import Dict, List, Optional
+from app.deps import INDEX_MMAP, INDEX_CACHE_SIZE, INFERENCE_SOCKET, EMBED_BACKEND
+from app.core.metrics import stage, record_cache
+
+_ENCODERS: dict = {}
+_ENCODERS_LOCK = threading.Lock()
+
+
+def register_encoder(model_name: str, model) -> None:
+    """Serve `model_name` from an already-built encoder (e.g. a small or fake one in benchmarks)."""
+    _ENCODERS[model_name] = model
+
+
+def load_encoder(model_name: str, local: bool = False):
+    """
+    Process-wide encoder cache; each model is loaded once instead of per request.
+    With INFERENCE_SOCKET set (and `local` False) the model lives in the shared
+    inference process and this returns a thin client for it.
+    """
+    model = _ENCODERS.get(model_name)
+    record_cache("encoder", model is not None)
+    if model is not None:
+        return model
+    with _ENCODERS_LOCK:
+        model = _ENCODERS.get(model_name)
+        if model is None:
+            if INFERENCE_SOCKET and not local:
+                from app.core.inference import RemoteEncoder
+                model = RemoteEncoder(model_name)
+            else:
+                # imported lazily: workers using the inference process never load torch
+                from app.core.encoders import build_encoder, encoder_label
+                with stage("model_load", encoder_label(EMBED_BACKEND)):
+                    model = build_encoder(model_name, EMBED_BACKEND)
+            _ENCODERS[model_name] = model
+    return model
+
+
+def _atomic_write(path: Path, write) -> None:
+    """Write via a temp file + rename so readers holding an mmap keep the old inode intact."""
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+class _MappedIndex:
+    """
+    One doc's normalized vectors (.vecs.npy) and chunk rows (.rows.jsonl with
+    an offsets table) opened read-only via mmap. Pages live in the OS page cache,
+    so every worker process shares a single copy.
+    """
+
+    def __init__(self, vecs_path: Path, rows_path: Path, offsets_path: Path):
+        self.vecs = np.load(vecs_path, mmap_mode="r")
+        self.offsets = np.load(offsets_path, mmap_mode="r")
+        with open(rows_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self.rows = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self) -> int:
+        return self.vecs.shape[0]
+
+    def search(self, qv: np.ndarray, top_k: int):
+        # exact inner product, same results as faiss.IndexFlatIP
+        scores = self.vecs @ qv[0]
+        k = min(top_k, len(scores))
+        if k <= 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+        idxs = np.argpartition(-scores, k - 1)[:k]
+        idxs = idxs[np.lexsort((idxs, -scores[idxs]))]  # score desc, ties by position
+        return scores[idxs], idxs
+
+    def row(self, i: int) -> dict:
+        return json.loads(self.rows[int(self.offsets[i]):int(self.offsets[i + 1])])
+
+
+_MAPPED: "OrderedDict[str, tuple]" = OrderedDict()
+_MAPPED_LOCK = threading.Lock()
+
 
 class IndexStore:
     def __init__(self, model_name: str, index_dir: Path):
-        self.model = SentenceTransformer(model_name)
+        self.model = load_encoder(model_name)
+        self.backend = getattr(self.model, "backend", "sentence-transformers")  # metric label
         self.index_dir = index_dir
         self.index_dir.mkdir(parents=True, exist_ok=True)
 
@@ -14,26 +94,127 @@ class IndexStore:
         base = self.index_dir / f"{doc_id}"
         return base.with_suffix(".faiss"), base.with_suffix(".meta.json")
 
-    def build(self, doc_id: str, chunks: List[dict]):
+    def _mmap_paths(self, doc_id: str):
+        base = self.index_dir / f"{doc_id}"
+        return base.with_suffix(".vecs.npy"), base.with_suffix(".rows.jsonl"), base.with_suffix(".rows.idx.npy")
+
+    def build(self, doc_id: str, chunks: List[dict], reuse: Optional[Dict[str, np.ndarray]] = None) -> int:
+        """
+        Embed and index `chunks`; returns the embedding dimension. Chunks whose
+        text is a key of `reuse` (see `vectors_by_text`) take that vector and
+        are not encoded again.
+        """
         texts = [c["text"] for c in chunks]
-        embeds = self.model.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+        reuse = reuse or {}
+        todo = [i for i, t in enumerate(texts) if t not in reuse]
+        if todo or not texts:
+            with stage("encode", self.backend):
+                fresh = self.model.encode([texts[i] for i in todo], normalize_embeddings=True,
+                                          convert_to_numpy=True)
+            fresh = np.asarray(fresh, dtype=np.float32)
+        if len(todo) == len(texts):
+            embeds = np.ascontiguousarray(fresh)
+        else:
+            d = fresh.shape[1] if todo else len(next(iter(reuse.values())))
+            embeds = np.empty((len(texts), d), dtype=np.float32)
+            for i, t in enumerate(texts):
+                if t in reuse:
+                    embeds[i] = reuse[t]
+            if todo:
+                embeds[todo] = fresh
         d = embeds.shape[1]
-        index = faiss.IndexFlatIP(d)
-        index.add(embeds)
-        idx_path, meta_path = self._paths(doc_id)
-        faiss.write_index(index, str(idx_path))
-        meta = {"doc_id": doc_id, "n": len(chunks), "chunks": chunks}
-        meta_path.write_text(json.dumps(meta, ensure_ascii=False))
+        if INDEX_MMAP:
+            self._write_mapped(doc_id, chunks, embeds)
+            stale = self._paths(doc_id)
+        else:
+            self._write_faiss(doc_id, chunks, embeds)
+            stale = self._mmap_paths(doc_id)
+        # one format per doc: drop what a build under the other INDEX_MMAP setting left behind
+        for path in stale:
+            path.unlink(missing_ok=True)
+        return d
+
+    def _write_faiss(self, doc_id: str, chunks: List[dict], embeds: np.ndarray) -> None:
+        with stage("index_write", "faiss"):
+            index = faiss.IndexFlatIP(embeds.shape[1])
+            index.add(embeds)
+            idx_path, meta_path = self._paths(doc_id)
+            faiss.write_index(index, str(idx_path))
+            meta = {"doc_id": doc_id, "n": len(chunks), "chunks": chunks}
+            meta_path.write_text(json.dumps(meta, ensure_ascii=False))
+
+    def _write_mapped(self, doc_id: str, chunks: List[dict], embeds: np.ndarray) -> None:
+        with stage("index_write", "mmap"):
+            vecs_path, rows_path, offsets_path = self._mmap_paths(doc_id)
+            rows = [json.dumps(c, ensure_ascii=False).encode("utf-8") + b"\n" for c in chunks]
+            offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+            np.cumsum([len(r) for r in rows], out=offsets[1:])
+            _atomic_write(rows_path, lambda f: f.writelines(rows))
+            _atomic_write(offsets_path, lambda f: np.save(f, offsets))
+            # vectors last: their mtime is what invalidates mapped copies in other workers
+            _atomic_write(vecs_path, lambda f: np.save(f, embeds))
+
+    def vectors_by_text(self, doc_id: str) -> Dict[str, np.ndarray]:
+        """An indexed doc's chunk vectors keyed by chunk text, for `build(reuse=...)`."""
+        mapped = self._open_mapped(doc_id)
+        if mapped is not None:
+            texts = [mapped.row(i)["text"] for i in range(len(mapped))]
+            vecs = np.array(mapped.vecs)  # copy: the file may be replaced while we hold it
+        else:
+            idx_path, meta_path = self._paths(doc_id)
+            index = faiss.read_index(str(idx_path))
+            texts = [c["text"] for c in json.loads(meta_path.read_text())["chunks"]]
+            vecs = index.reconstruct_n(0, index.ntotal)
+        return dict(zip(texts, vecs))
+
+    def _open_mapped(self, doc_id: str) -> Optional[_MappedIndex]:
+        """Cached mmap view, reopened when the vectors file is replaced; None for faiss-format docs."""
+        vecs_path, rows_path, offsets_path = self._mmap_paths(doc_id)
+        try:
+            st = vecs_path.stat()
+        except FileNotFoundError:
+            return None
+        key, stamp = str(vecs_path), (st.st_ino, st.st_mtime_ns)
+        with _MAPPED_LOCK:
+            hit = _MAPPED.get(key)
+            if hit is not None and hit[0] == stamp:
+                _MAPPED.move_to_end(key)
+                record_cache("index_mmap", True)
+                return hit[1]
+        record_cache("index_mmap", False)
+        mapped = _MappedIndex(vecs_path, rows_path, offsets_path)
+        with _MAPPED_LOCK:
+            _MAPPED[key] = (stamp, mapped)
+            _MAPPED.move_to_end(key)
+            while len(_MAPPED) > INDEX_CACHE_SIZE:
+                _MAPPED.popitem(last=False)
+        return mapped
 
     def search(self, doc_id: str, query: str, top_k: int = 50):
+        mapped = None
         idx_path, meta_path = self._paths(doc_id)
-        index = faiss.read_index(str(idx_path))
-        meta = json.loads(meta_path.read_text())
-        qv = self.model.encode([query], normalize_embeddings=True, convert_to_numpy=True)
-        scores, idxs = index.search(qv, top_k)
+        if INDEX_MMAP or not idx_path.exists():  # docs built with INDEX_MMAP=1 only have the mmap set
+            with stage("index_load", "mmap"):
+                mapped = self._open_mapped(doc_id)
+        if mapped is None:
+            with stage("index_load", "faiss"):
+                index = faiss.read_index(str(idx_path))
+                meta = json.loads(meta_path.read_text())
+        with stage("query_encode", self.backend):
+            qv = self.model.encode([query], normalize_embeddings=True, convert_to_numpy=True)
+
         results = []
+        if mapped is not None:
+            with stage("index_search", "mmap"):
+                scores, idxs = mapped.search(np.asarray(qv, dtype=np.float32), top_k)
+                for rank, (i, s) in enumerate(zip(idxs, scores)):
+                    results.append({"rank": rank, "score": float(s), **mapped.row(i)})
+            return results
+
+        with stage("index_search", "faiss"):
+            scores, idxs = index.search(qv, top_k)
         for rank, (i, s) in enumerate(zip(idxs[0], scores[0])):
             if 0 <= i < meta["n"]:
                 ch = meta["chunks"][i]
                 results.append({"rank": rank, "score": float(s), **ch})
-        return results
\ No newline at end of file
+        return results
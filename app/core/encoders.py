@@ -0,0 +1,324 @@
+"""
+Encoder backends for embedding (bi-encoder) and reranking (cross-encoder).
+
+    EMBED_BACKEND / RERANK_BACKEND = torch | onnx | onnx-int8
+
+- torch:     sentence-transformers in fp32 PyTorch (the original path);
+- onnx:      the same weights exported once to ONNX and run with ONNX Runtime;
+- onnx-int8: that export with dynamic int8 weight quantization.
+
+Exports are cached under MODEL_CACHE_DIR, one directory per model and task,
+so only the first load pays for them. The ONNX backends tokenize a call's
+inputs once, sort them by token length and pack batches up to
+ENCODER_MAX_BATCH_TOKENS padded tokens, so short chunks are not padded to the
+length of the longest one; torch keeps sentence-transformers' own single
+tokenization and length-sorted batching. ENCODER_THREADS caps intra-op threads
+(0 = runtime default).
+
+onnxruntime (and onnx, for int8) are optional; they are only imported when
+an onnx backend is selected.
+"""
+from __future__ import annotations
+import inspect
+import json
+import os
+import re
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from app.deps import ENCODER_THREADS, ENCODER_MAX_BATCH_TOKENS, MODEL_CACHE_DIR
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+_EXPORT_LOCK = threading.Lock()
+
+
+def length_batches(lengths: Sequence[int], max_items: int = 32,
+                   max_tokens: int = ENCODER_MAX_BATCH_TOKENS) -> List[np.ndarray]:
+    """
+    Group input positions into batches of similar length, longest first, so each
+    batch pads to at most `max_tokens` (len(batch) * longest) and `max_items` rows.
+    """
+    order = np.argsort(-np.asarray(lengths, dtype=np.int64), kind="stable")
+    batches, cur, cur_max = [], [], 0
+    for i in order:
+        longest = max(cur_max, int(lengths[i]))
+        if cur and (len(cur) >= max_items or longest * (len(cur) + 1) > max_tokens):
+            batches.append(np.asarray(cur))
+            cur, longest = [], int(lengths[i])
+        cur.append(int(i))
+        cur_max = longest
+    if cur:
+        batches.append(np.asarray(cur))
+    return batches
+
+
+def _set_torch_threads() -> None:
+    if ENCODER_THREADS > 0:
+        import torch
+        torch.set_num_threads(ENCODER_THREADS)
+
+
+# ------------------------- torch -------------------------
+
+class TorchEncoder:
+    """SentenceTransformer as is: it already sorts inputs by length before batching."""
+
+    backend = "sentence-transformers"
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        _set_torch_threads()
+        self.model = SentenceTransformer(model_name)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, sentences, normalize_embeddings: bool = False, convert_to_numpy: bool = True,
+               batch_size: int = 32, **kwargs) -> np.ndarray:
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        sentences = list(sentences)
+        if not sentences:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+        return self.model.encode(sentences, batch_size=batch_size, normalize_embeddings=normalize_embeddings,
+                                 convert_to_numpy=True, show_progress_bar=False)
+
+
+class TorchReranker:
+    """CrossEncoder as is: it already sorts inputs by length before batching."""
+
+    backend = "cross-encoder"
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import CrossEncoder
+        _set_torch_threads()
+        self.model = CrossEncoder(model_name)
+
+    def predict(self, pairs, batch_size: int = 32, **kwargs) -> np.ndarray:
+        pairs = [tuple(p) for p in pairs]
+        if not pairs:
+            return np.zeros(0, dtype=np.float32)
+        return np.asarray(self.model.predict(pairs, batch_size=batch_size, show_progress_bar=False))
+
+
+# ------------------------- onnx -------------------------
+
+def _model_file(model_name: str, relpath: str) -> Optional[Path]:
+    """A file from a local model dir or the Hugging Face cache/hub; None if the model has none."""
+    local = Path(model_name)
+    if local.is_dir():
+        path = local / relpath
+        return path if path.exists() else None
+    try:
+        from huggingface_hub import hf_hub_download
+        return Path(hf_hub_download(model_name, relpath))
+    except Exception:
+        return None
+
+
+def _read_json(model_name: str, relpath: str) -> dict:
+    path = _model_file(model_name, relpath)
+    return json.loads(path.read_text()) if path else {}
+
+
+def _st_settings(model_name: str) -> dict:
+    """Pooling mode and max length from the sentence-transformers config, so ONNX matches torch."""
+    pooling_dir = next((m["path"] for m in _read_json(model_name, "modules.json") or []
+                        if m.get("type", "").endswith("Pooling")), "1_Pooling")
+    pooling = _read_json(model_name, f"{pooling_dir}/config.json")
+    mode = "mean"
+    if pooling.get("pooling_mode_cls_token"):
+        mode = "cls"
+    elif pooling.get("pooling_mode_max_tokens"):
+        mode = "max"
+    max_length = _read_json(model_name, "sentence_bert_config.json").get("max_seq_length") or 512
+    return {"pooling": mode, "max_length": int(max_length)}
+
+
+def _export_dir(model_name: str, task: str) -> Path:
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "--", model_name.strip("/"))
+    return MODEL_CACHE_DIR / slug / task
+
+
+def _export(model_name: str, task: str, quantize: bool) -> Path:
+    """
+    Export `model_name` to ONNX once (fp32, plus an int8 copy on request) and
+    return the .onnx path. Writes go to a temp dir/file and are renamed into
+    place, so concurrent workers never load a half-written model.
+    """
+    out = _export_dir(model_name, task)
+    fp32, int8 = out / "model.onnx", out / "model.int8.onnx"
+    with _EXPORT_LOCK:
+        if not fp32.exists():
+            import torch
+            from transformers import AutoModel, AutoModelForSequenceClassification, AutoTokenizer
+
+            tmp = out.with_name(f".{out.name}.{uuid.uuid4().hex}")
+            tmp.mkdir(parents=True)
+            try:
+                cls = AutoModelForSequenceClassification if task == "rerank" else AutoModel
+                model = cls.from_pretrained(model_name).eval()
+                tokenizer = AutoTokenizer.from_pretrained(model_name)
+                sample = dict(tokenizer(["a b"], ["c d"] if task == "rerank" else None, return_tensors="pt"))
+                # graph inputs are named positionally, so follow forward()'s order, not the tokenizer's
+                names = [n for n in inspect.signature(model.forward).parameters if n in sample]
+                sample = {n: sample[n] for n in names}
+                axes = {n: {0: "batch", 1: "seq"} for n in names}
+                with torch.no_grad():
+                    torch.onnx.export(model, (sample,), str(tmp / "model.onnx"), input_names=names,
+                                      output_names=["output"], dynamic_axes=axes, opset_version=17,
+                                      dynamo=False)
+                tokenizer.save_pretrained(str(tmp))
+                try:
+                    os.replace(tmp, out)
+                except OSError:
+                    shutil.rmtree(tmp, ignore_errors=True)  # another worker won the race
+            except BaseException:
+                shutil.rmtree(tmp, ignore_errors=True)
+                raise
+        if quantize and not int8.exists():
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            tmp_file = out / f".model.int8.{uuid.uuid4().hex}.onnx"
+            quantize_dynamic(str(fp32), str(tmp_file), weight_type=QuantType.QInt8,
+                             use_external_data_format=(out / "model.onnx.data").exists())
+            os.replace(tmp_file, int8)
+    return int8 if quantize else fp32
+
+
+def _session(path: Path):
+    import onnxruntime as ort
+
+    opts = ort.SessionOptions()
+    opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    if ENCODER_THREADS > 0:
+        opts.intra_op_num_threads = ENCODER_THREADS
+        opts.inter_op_num_threads = 1
+    return ort.InferenceSession(str(path), opts, providers=["CPUExecutionProvider"])
+
+
+class _OnnxModel:
+    task = ""
+
+    def __init__(self, model_name: str, quantize: bool = False):
+        from transformers import AutoTokenizer
+
+        self.backend = "onnx-int8" if quantize else "onnx"
+        path = _export(model_name, self.task, quantize)
+        self.session = _session(path)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(str(path.parent))
+
+    def _run(self, enc, idx: np.ndarray):
+        """Pad one batch and run it; returns (first model output, attention mask)."""
+        width = max(len(enc["input_ids"][i]) for i in idx)
+        pad = {"input_ids": self.tokenizer.pad_token_id or 0}
+        feats = {}
+        for name in self.input_names:
+            arr = np.full((len(idx), width), pad.get(name, 0), dtype=np.int64)
+            for row, i in enumerate(idx):
+                seq = enc[name][i]
+                if self.tokenizer.padding_side == "left":
+                    arr[row, width - len(seq):] = seq
+                else:
+                    arr[row, :len(seq)] = seq
+            feats[name] = arr
+        return self.session.run(None, feats)[0], feats["attention_mask"]
+
+
+class OnnxEncoder(_OnnxModel):
+    task = "embed"
+
+    def __init__(self, model_name: str, quantize: bool = False):
+        super().__init__(model_name, quantize)
+        settings = _st_settings(model_name)
+        self.pooling = settings["pooling"]
+        self.max_length = settings["max_length"]
+        self.dim: Optional[int] = None
+
+    def get_sentence_embedding_dimension(self) -> int:
+        if self.dim is None:
+            self.dim = int(self.encode(["a"]).shape[1])
+        return self.dim
+
+    def _pool(self, hidden: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        if self.pooling == "cls":
+            return hidden[:, 0]
+        m = mask[..., None].astype(hidden.dtype)
+        if self.pooling == "max":
+            return np.where(m > 0, hidden, -1e9).max(axis=1)
+        return (hidden * m).sum(axis=1) / np.maximum(m.sum(axis=1), 1e-9)
+
+    def encode(self, sentences, normalize_embeddings: bool = False, convert_to_numpy: bool = True,
+               batch_size: int = 32, **kwargs) -> np.ndarray:
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        sentences = list(sentences)
+        if not sentences:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        enc = self.tokenizer(sentences, truncation=True, max_length=self.max_length)
+        out = None
+        for idx in length_batches([len(x) for x in enc["input_ids"]], batch_size):
+            hidden, mask = self._run(enc, idx)
+            pooled = self._pool(hidden, mask)
+            if out is None:
+                out = np.zeros((len(sentences), pooled.shape[1]), dtype=np.float32)
+                self.dim = pooled.shape[1]
+            out[idx] = pooled
+        if normalize_embeddings:
+            out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+        return out
+
+
+class OnnxReranker(_OnnxModel):
+    task = "rerank"
+
+    def __init__(self, model_name: str, quantize: bool = False):
+        super().__init__(model_name, quantize)
+        self.max_length = int(_read_json(model_name, "tokenizer_config.json").get("model_max_length", 512))
+        self.max_length = min(self.max_length, 512)
+
+    def predict(self, pairs, batch_size: int = 32, **kwargs) -> np.ndarray:
+        pairs = [tuple(p) for p in pairs]
+        out = np.zeros(len(pairs), dtype=np.float32)
+        if not pairs:
+            return out
+        enc = self.tokenizer([q for q, _ in pairs], [p for _, p in pairs], truncation=True,
+                             max_length=self.max_length)
+        for idx in length_batches([len(x) for x in enc["input_ids"]], batch_size):
+            logits, _ = self._run(enc, idx)
+            # CrossEncoder applies a sigmoid to single-label models; keep scores comparable
+            out[idx] = 1.0 / (1.0 + np.exp(-logits[:, 0])) if logits.shape[1] == 1 else logits[:, 1]
+        return out
+
+
+# metric labels: what the loaded model reports as `.backend`, known before it loads
+
+def encoder_label(backend: str) -> str:
+    return TorchEncoder.backend if backend == "torch" else backend
+
+
+def reranker_label(backend: str) -> str:
+    return TorchReranker.backend if backend == "torch" else backend
+
+
+def build_encoder(model_name: str, backend: str):
+    if backend == "torch":
+        return TorchEncoder(model_name)
+    if backend in ("onnx", "onnx-int8"):
+        return OnnxEncoder(model_name, quantize=backend == "onnx-int8")
+    raise ValueError(f"unknown EMBED_BACKEND {backend!r}; expected one of {BACKENDS}")
+
+
+def build_reranker(model_name: str, backend: str):
+    if backend == "torch":
+        return TorchReranker(model_name)
+    if backend in ("onnx", "onnx-int8"):
+        return OnnxReranker(model_name, quantize=backend == "onnx-int8")
+    raise ValueError(f"unknown RERANK_BACKEND {backend!r}; expected one of {BACKENDS}")
@@ -0,0 +1,298 @@
+"""
+Shared model process for multi-worker serving.
+
+    python -m app.core.inference              # listens on INFERENCE_SOCKET
+
+Run one of these next to `uvicorn --workers N` with the same INFERENCE_SOCKET
+and every worker sends encode/rerank calls here instead of loading its own
+copy of the embedding model and cross-encoder. Requests that arrive while the
+model is busy are merged into a single batch.
+
+Messages are pickled, so the socket must only be reachable by the app: TCP
+addresses are limited to loopback, and connections need INFERENCE_AUTHKEY.
+For a unix socket with no key configured the server generates one at start
+and writes it to `<socket>.key` (mode 0600), where workers of the same user
+pick it up. TCP always requires an explicit INFERENCE_AUTHKEY.
+"""
+from __future__ import annotations
+import argparse
+import ipaddress
+import os
+import queue
+import secrets
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from typing import List, Optional
+
+import numpy as np
+
+from app.deps import INFERENCE_SOCKET, INFERENCE_AUTHKEY, INFERENCE_CONNECT_TIMEOUT
+
+MAX_BATCH_ITEMS = int(os.getenv("INFERENCE_MAX_BATCH", "256"))
+
+
+def _address(spec: str):
+    """`host:port` for TCP (loopback only), anything else is a unix socket path."""
+    host, sep, port = spec.rpartition(":")
+    if sep and port.isdigit() and "/" not in spec:
+        host = host or "127.0.0.1"
+        try:  # multiprocessing.connection speaks IPv4 only for (host, port) addresses
+            loopback = host == "localhost" or ipaddress.IPv4Address(host).is_loopback
+        except ValueError:
+            loopback = False
+        if not loopback:
+            raise ValueError(f"INFERENCE_SOCKET must be a unix socket or a loopback address, not {spec!r}")
+        return (host, int(port))
+    return spec
+
+
+def _key_path(address) -> str:
+    return f"{address}.key"
+
+
+def _server_authkey(address, configured: str) -> bytes:
+    """The configured key, or a fresh one written next to the unix socket."""
+    if configured:
+        return configured.encode("utf-8")
+    if not isinstance(address, str):
+        raise RuntimeError("INFERENCE_AUTHKEY must be set when INFERENCE_SOCKET is a TCP address")
+    key = secrets.token_hex(32)
+    path = _key_path(address)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(key)
+    os.replace(tmp, path)
+    return key.encode("utf-8")
+
+
+def _client_authkey(address, configured: str) -> bytes:
+    """The configured key, or the one the server wrote; refuses key files others could read or write."""
+    if configured:
+        return configured.encode("utf-8")
+    if not isinstance(address, str):
+        raise RuntimeError("INFERENCE_AUTHKEY must be set when INFERENCE_SOCKET is a TCP address")
+    path = _key_path(address)
+    st = os.stat(path)
+    if st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise RuntimeError(f"{path} must be owned by this user with mode 0600")
+    with open(path) as f:
+        return f.read().strip().encode("utf-8")
+
+
+class InferenceServer:
+    def __init__(self, address: str = INFERENCE_SOCKET, authkey: str = INFERENCE_AUTHKEY):
+        if not address:
+            raise RuntimeError("INFERENCE_SOCKET not set")
+        self.address = _address(address)
+        self.authkey = authkey
+        self._queue: "queue.Queue" = queue.Queue()
+        self._listener: Optional[Listener] = None
+        self._closed = threading.Event()
+
+    def _model(self, op: str, model_name: str):
+        # local=True: this process is where the models actually live
+        if op == "encode":
+            from app.core.embed import load_encoder
+            return load_encoder(model_name, local=True)
+        from app.core.retrieve import load_reranker
+        return load_reranker(model_name, local=True)
+
+    def _run_batches(self) -> None:
+        """Single inference thread: drain compatible pending requests and run them as one call."""
+        while not self._closed.is_set():
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deferred = []
+            total = len(first[2])
+            while total < MAX_BATCH_ITEMS:
+                try:
+                    nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    self._queue.put(None)
+                    break
+                if nxt[:2] == first[:2] and nxt[3] == first[3]:
+                    batch.append(nxt)
+                    total += len(nxt[2])
+                else:
+                    deferred.append(nxt)
+            for item in deferred:
+                self._queue.put(item)
+
+            op, model_name, _, kwargs, _ = first
+            inputs = [x for req in batch for x in req[2]]
+            try:
+                model = self._model(op, model_name)
+                if op == "encode":
+                    out = np.asarray(model.encode(inputs, **dict(kwargs)))
+                else:
+                    out = np.asarray(model.predict(inputs))
+            except Exception as e:
+                for req in batch:
+                    req[4].set_exception(e)
+                continue
+            start = 0
+            for req in batch:
+                n = len(req[2])
+                req[4].set_result(out[start:start + n])
+                start += n
+
+    def _serve_conn(self, conn) -> None:
+        with conn:
+            while True:
+                try:
+                    msg = conn.recv()
+                except (EOFError, OSError):
+                    return
+                op = msg[0]
+                if op == "ping":
+                    conn.send(("ok", "pong"))
+                    continue
+                if op not in ("encode", "rerank"):
+                    conn.send(("error", f"unknown op {op!r}"))
+                    continue
+                _, model_name, inputs, kwargs = msg
+                fut: Future = Future()
+                self._queue.put((op, model_name, list(inputs), tuple(sorted(kwargs.items())), fut))
+                try:
+                    conn.send(("ok", fut.result()))
+                except Exception as e:
+                    # send text, not the exception: it may not be picklable
+                    conn.send(("error", f"{type(e).__name__}: {e}"))
+
+    def serve_forever(self) -> None:
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+        authkey = _server_authkey(self.address, self.authkey)
+        umask = os.umask(0o077)  # the socket file is created 0600, with no window before a chmod
+        try:
+            self._listener = Listener(self.address, authkey=authkey)
+        finally:
+            os.umask(umask)
+        threading.Thread(target=self._run_batches, daemon=True).start()
+        try:
+            while not self._closed.is_set():
+                try:
+                    conn = self._listener.accept()
+                except OSError:
+                    if self._closed.is_set():
+                        break
+                    continue
+                threading.Thread(target=self._serve_conn, args=(conn,), daemon=True).start()
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._queue.put(None)
+        if self._listener is not None:
+            self._listener.close()
+
+
+class _RemoteModel:
+    """
+    Client side: one connection per thread, reconnecting once if the server
+    restarted. Connects wait up to INFERENCE_CONNECT_TIMEOUT for a server that
+    is still starting (e.g. preloading models before it listens).
+    """
+
+    def __init__(self, model_name: str, address: str = INFERENCE_SOCKET, authkey: str = INFERENCE_AUTHKEY,
+                 connect_timeout: float = INFERENCE_CONNECT_TIMEOUT):
+        self.model_name = model_name
+        self.address = _address(address)
+        self.authkey = authkey
+        self.connect_timeout = connect_timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        # no socket or key file yet, nobody listening, or a key rotated by a restart
+        retryable = (FileNotFoundError, ConnectionRefusedError) + (() if self.authkey else (AuthenticationError,))
+        deadline = time.monotonic() + self.connect_timeout
+        delay = 0.05
+        while True:
+            try:
+                # read per connect: a restarted server writes a new generated key
+                authkey = _client_authkey(self.address, self.authkey)
+                return Client(self.address, authkey=authkey)
+            except retryable:
+                if time.monotonic() + delay > deadline:
+                    raise
+                time.sleep(delay)
+                delay = min(delay * 2, 2.0)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def _call(self, op: str, inputs: List, kwargs: dict):
+        for attempt in (1, 2):
+            conn = self._conn()  # outside the try: it already waited out a missing server
+            try:
+                conn.send((op, self.model_name, inputs, kwargs))
+                status, payload = conn.recv()
+                break
+            except (EOFError, OSError):
+                self._local.conn = None
+                if attempt == 2:
+                    raise
+        if status == "error":
+            raise RuntimeError(f"inference server: {payload}")
+        return payload
+
+
+class RemoteEncoder(_RemoteModel):
+    backend = "inference"
+
+    def encode(self, sentences, normalize_embeddings: bool = False, convert_to_numpy: bool = True,
+               batch_size: int = 32, **kwargs) -> np.ndarray:
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        return self._call("encode", list(sentences), {
+            "normalize_embeddings": normalize_embeddings,
+            "convert_to_numpy": True,
+            "batch_size": batch_size,
+        })
+
+
+class RemoteReranker(_RemoteModel):
+    backend = "inference"
+
+    def predict(self, pairs, batch_size: int = 32, **kwargs) -> np.ndarray:
+        return self._call("rerank", [tuple(p) for p in pairs], {})
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Shared embedding/rerank model process.")
+    ap.add_argument("--socket", default=INFERENCE_SOCKET, help="unix socket path or host:port")
+    ap.add_argument("--preload", action="store_true", help="load EMBED_MODEL and RERANK_MODEL before serving")
+    ap.add_argument("--wait", type=float, metavar="SECONDS",
+                    help="don't serve: exit once a server on --socket answers, failing after SECONDS")
+    args = ap.parse_args(argv)
+    if args.wait is not None:
+        _RemoteModel("", args.socket, connect_timeout=args.wait)._call("ping", [], {})
+        return
+    server = InferenceServer(args.socket)
+    if args.preload:
+        from app.deps import EMBED_MODEL, RERANK_MODEL
+        server._model("encode", EMBED_MODEL)
+        server._model("rerank", RERANK_MODEL)
+    print(f"inference server listening on {args.socket}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+from __future__ import annotations
+import json
+import re
+from typing import Any, List, Optional, Tuple
+
+# inside a string only quotes and backslashes change parser state
+_STR_SPECIAL = re.compile(r'["\\]')
+# outside a string only structural characters matter
+_STRUCT_SPECIAL = re.compile(r'[{}\[\]",]')
+
+
+class StreamingJSONParser:
+    """
+    Incremental parser for the first top-level JSON object in a token stream.
+
+    Feed text as it arrives from the LLM; anything before the first `{`
+    (prose, code fences) is skipped. `done` flips as soon as a top-level
+    object closes and parses, so the caller can stop generation; a balanced
+    candidate that is not valid JSON is dropped and scanning resumes after
+    it. Every top-level field is decoded exactly once when its value
+    completes (fields of a dropped candidate are discarded). `result()`
+    repairs truncated output by closing open strings/arrays/objects.
+    """
+
+    def __init__(self):
+        self.done = False
+        self._reset()
+
+    def _reset(self) -> None:
+        self.fields: dict = {}
+        self._buf: List[str] = []
+        self._len = 0
+        self._stack: List[str] = []
+        self._in_str = False
+        self._esc = False
+        self._field_start: Optional[int] = None
+        # (cut position, open containers) where the object can be truncated cleanly
+        self._safe: List[Tuple[int, str]] = []
+        self._obj: Any = None
+
+    @property
+    def started(self) -> bool:
+        return bool(self._buf)
+
+    def text(self) -> str:
+        return "".join(self._buf)
+
+    def feed(self, piece: str) -> List[Tuple[str, Any]]:
+        """Consume a chunk; return top-level (key, value) pairs completed by it."""
+        completed: List[Tuple[str, Any]] = []
+        # a loop, not recursion: one piece may hold any number of dropped candidates
+        while piece and not self.done:
+            piece = self._scan(piece, completed)
+        return completed
+
+    def _scan(self, piece: str, completed: List[Tuple[str, Any]]) -> str:
+        """Consume `piece` into the current candidate; returns what follows a dropped candidate, else ''."""
+        mark = len(completed)
+        i = 0
+        if not self._buf:
+            start = piece.find("{")
+            if start == -1:
+                return ""
+            piece = piece[start:]
+
+        n = len(piece)
+        while i < n:
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                    i += 1
+                    continue
+                m = _STR_SPECIAL.search(piece, i)
+                if m is None:
+                    i = n
+                    break
+                i = m.start()
+                if piece[i] == "\\":
+                    self._esc = True
+                else:
+                    self._in_str = False
+                i += 1
+                continue
+
+            if self._stack:
+                m = _STRUCT_SPECIAL.search(piece, i)
+                if m is None:
+                    i = n
+                    break
+                i = m.start()
+            ch = piece[i]
+            pos = self._len + i  # absolute offset of `ch` in the object text
+            if ch == '"':
+                self._in_str = True
+            elif ch in "{[":
+                if not self._stack and ch != "{":
+                    i += 1
+                    continue
+                self._stack.append(ch)
+                self._safe.append((pos + 1, "".join(self._stack)))
+                if len(self._stack) == 1:
+                    self._field_start = pos + 1
+            elif ch in "}]":
+                if not self._stack:
+                    i += 1
+                    continue
+                if len(self._stack) == 1:
+                    self._buf.append(piece[:i + 1])
+                    self._len += i + 1
+                    completed.extend(self._close_field(pos))
+                    self._stack.pop()
+                    try:
+                        self._obj = json.loads(self.text())
+                    except ValueError:
+                        # a balanced but invalid candidate (e.g. "{title, tasks}" in prose):
+                        # forget it and look for the next object in the rest of the stream
+                        del completed[mark:]
+                        self._reset()
+                        return piece[i + 1:]
+                    self.done = True
+                    return ""
+                self._stack.pop()
+            elif ch == ",":
+                self._safe.append((pos, "".join(self._stack)))
+                if len(self._stack) == 1:
+                    self._buf.append(piece[:i])
+                    self._len += i
+                    piece, n, i = piece[i:], n - i, 0
+                    completed.extend(self._close_field(pos))
+                    self._field_start = pos + 1
+            i += 1
+
+        self._buf.append(piece)
+        self._len += len(piece)
+        return ""
+
+    def _close_field(self, end: int) -> List[Tuple[str, Any]]:
+        if self._field_start is None:
+            return []
+        text = self.text()
+        segment = text[self._field_start:end].strip()
+        self._field_start = None
+        if not segment:
+            return []
+        try:
+            pair = json.loads("{" + segment + "}")
+        except Exception:
+            return []
+        self.fields.update(pair)
+        return list(pair.items())
+
+    def result(self) -> dict:
+        """
+        Return the parsed object. Truncated output is repaired by closing open
+        containers, backing off to the last clean cut point if needed; as a
+        last resort the fields completed so far are returned. Raises
+        ValueError when nothing non-empty can be recovered.
+        """
+        if self._obj is not None:
+            return self._obj
+        if not self._buf:
+            raise ValueError("no JSON object in model output")
+
+        text = self.text()
+        if self.done:
+            try:
+                self._obj = json.loads(text)
+                return self._obj
+            except Exception:
+                pass
+        else:
+            closers = "".join("}" if c == "{" else "]" for c in reversed(self._stack))
+            tail = text
+            if self._in_str:
+                tail = (tail[:-1] if self._esc else tail) + '"'
+            candidates = [tail + closers, tail.rstrip().rstrip(",") + closers]
+            for cut, stack in reversed(self._safe):
+                closers = "".join("}" if c == "{" else "]" for c in reversed(stack))
+                candidates.append(text[:cut].rstrip().rstrip(",") + closers)
+            for candidate in candidates:
+                try:
+                    obj = json.loads(candidate)
+                except Exception:
+                    continue
+                # cutting back to the opening brace always "parses" as {}; that is not a repair
+                if obj:
+                    self._obj = obj
+                    return self._obj
+
+        if self.fields:
+            self._obj = dict(self.fields)
+            return self._obj
+        raise ValueError("could not parse JSON from model output")
@@ -1,8 +1,12 @@
 from __future__ import annotations
 import requests, json, os, time
+from app.core.metrics import stage, record_tokens
+from app.core.llm_router import LLM_ROUTING, get_router
 
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://ollama:11434")
 OLLAMA_TIMEOUT_SEC = int(os.getenv("OLLAMA_TIMEOUT_SEC", "600"))
+OLLAMA_CONNECT_TIMEOUT_SEC = float(os.getenv("OLLAMA_CONNECT_TIMEOUT_SEC", "3"))
 OLLAMA_RETRY = int(os.getenv("OLLAMA_RETRY", "6"))
 OLLAMA_BACKOFF = float(os.getenv("OLLAMA_BACKOFF", "2.0"))
 
@@ -20,13 +24,72 @@ class LLMClient:
         self.use_local = use_local
         self.openai_key = openai_key
 
+    @property
+    def backend(self) -> str:
+        return "ollama" if self.use_local else "openai"
+
+    @property
+    def backends(self) -> list:
+        """Backends this client can reach, the configured one first."""
+        usable = ["ollama"] + (["openai"] if self.openai_key else [])
+        return sorted(usable, key=lambda b: b != self.backend)
+
     def generate(self, system: str, user: str, expect_json: bool = False) -> str:
-        if self.use_local:
-            return self._ollama_generate(system, user, expect_json=expect_json)
-        return self._openai_chat(system, user, expect_json)
+        if LLM_ROUTING == "hedged":
+            # hedging keys off time to first token, so go through the streaming path
+            with stage("llm_generate", "hedged"):
+                return "".join(get_router().stream(self, system, user, expect_json)).strip()
+        with stage("llm_generate", self.backend):
+            if self.use_local:
+                return self._ollama_generate(system, user, expect_json=expect_json)
+            return self._openai_chat(system, user, expect_json)
 
-    def _openai_chat(self, system: str, user: str, expect_json: bool) -> str:
-        url = "https://api.openai.com/v1/chat/completions"
+    def stream(self, system: str, user: str, expect_json: bool = False):
+        """
+        Yield response text as the backend generates it. Closing the generator
+        (e.g. breaking out of the loop) drops the connection, which stops
+        generation server-side.
+        """
+        if LLM_ROUTING == "hedged":
+            return get_router().stream(self, system, user, expect_json)
+        return self.stream_from(self.backend, system, user, expect_json)
+
+    def stream_from(self, backend: str, system: str, user: str, expect_json: bool = False, cancel=None):
+        """
+        Stream from one specific backend, bypassing routing. A router that owns
+        failover passes `cancel` (a threading.Event): Ollama then makes a single
+        attempt without pulling the model, and gives up as soon as it is set.
+        """
+        usage: dict = {}
+        if backend == "ollama":
+            pieces = self._ollama_stream(system, user, expect_json, usage, cancel)
+        else:
+            pieces = self._openai_stream(system, user, expect_json, usage)
+        return self._timed_stream(pieces, backend, usage)
+
+    @staticmethod
+    def _timed_stream(pieces, backend: str, usage: dict):
+        streamed = 0
+        try:
+            with stage("llm_stream", backend):
+                with stage("llm_first_token", backend):
+                    first = next(pieces, None)
+                if first is None:
+                    return
+                streamed = 1
+                yield first
+                for piece in pieces:
+                    streamed += 1
+                    yield piece
+        finally:
+            # usage only arrives with the last message; a stream closed early (e.g. /extract
+            # once the object is complete) never sees it, so count pieces (~1 token each)
+            if usage:
+                record_tokens(backend, usage.get("prompt"), usage.get("completion"))
+            else:
+                record_tokens(backend, None, streamed)
+
+    def _openai_request(self, system: str, user: str, expect_json: bool):
         key = self.openai_key
         if not key:
             raise RuntimeError("OPENAI_API_KEY not set")
@@ -42,37 +105,102 @@ class LLMClient:
         }
         if expect_json:
             payload["response_format"] = {"type": "json_object"}
+        return f"{OPENAI_BASE_URL}/chat/completions", headers, payload
+
+    def _openai_chat(self, system: str, user: str, expect_json: bool) -> str:
+        url, headers, payload = self._openai_request(system, user, expect_json)
         resp = requests.post(url, headers=headers, json=payload, timeout=120)
         resp.raise_for_status()
-        return resp.json()["choices"][0]["message"]["content"].strip()
+        data = resp.json()
+        usage = data.get("usage") or {}
+        record_tokens("openai", usage.get("prompt_tokens"), usage.get("completion_tokens"))
+        return data["choices"][0]["message"]["content"].strip()
 
-    def _ollama_generate(self, system: str, user: str, expect_json: bool) -> str:
+    def _openai_stream(self, system: str, user: str, expect_json: bool, usage: dict):
+        url, headers, payload = self._openai_request(system, user, expect_json)
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}
+        with requests.post(url, headers=headers, json=payload, timeout=120, stream=True) as resp:
+            resp.raise_for_status()
+            for line in resp.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                if chunk.get("usage"):
+                    usage.update(prompt=chunk["usage"].get("prompt_tokens"),
+                                 completion=chunk["usage"].get("completion_tokens"))
+                choices = chunk.get("choices") or []
+                piece = (choices[0].get("delta") or {}).get("content") if choices else None
+                if piece:
+                    yield piece
+
+    def _ollama_payload(self, system: str, user: str, expect_json: bool, stream: bool,
+                        ensure_model: bool = True) -> dict:
         model = _normalize_ollama_name(self.local or "llama3.1")
-        self._ollama_ensure_model(model)
+        if ensure_model:
+            self._ollama_ensure_model(model)
 
         prompt = f"System:\n{system}\n\nUser:\n{user}"
-        url = f"{OLLAMA_BASE_URL}/api/generate"
-        payload = {
+        return {
             "model": model,
             "prompt": prompt,
-            "stream": False,
+            "stream": stream,
             "keep_alive": "3m",
             **({"format": "json"} if expect_json else {}),
         }
 
+    def _ollama_post(self, payload: dict, stream: bool = False, retries: int = OLLAMA_RETRY, cancel=None):
+        """The generate response, or None if `cancel` was set while waiting for it."""
+        url = f"{OLLAMA_BASE_URL}/api/generate"
         last_exc = None
-        for attempt in range(1, OLLAMA_RETRY + 1):
+        for attempt in range(1, retries + 1):
+            if cancel is not None and cancel.is_set():
+                return None
             try:
-                r = requests.post(url, json=payload, timeout=OLLAMA_TIMEOUT_SEC)
+                r = requests.post(url, json=payload, timeout=(OLLAMA_CONNECT_TIMEOUT_SEC, OLLAMA_TIMEOUT_SEC),
+                                  stream=stream)
                 r.raise_for_status()
-                data = r.json()
-                return data.get("response", "").strip()
+                return r
             except (requests.exceptions.ReadTimeout, requests.exceptions.ConnectionError) as e:
                 last_exc = e
-                time.sleep(OLLAMA_BACKOFF * attempt)
+                if attempt == retries:
+                    break
+                if cancel is not None:
+                    cancel.wait(OLLAMA_BACKOFF * attempt)
+                else:
+                    time.sleep(OLLAMA_BACKOFF * attempt)
             except Exception:
                 raise
-        raise RuntimeError(f"Ollama generate failed after {OLLAMA_RETRY} attempts: {last_exc}")
+        raise RuntimeError(f"Ollama generate failed after {retries} attempts: {last_exc}")
+
+    def _ollama_generate(self, system: str, user: str, expect_json: bool) -> str:
+        payload = self._ollama_payload(system, user, expect_json, stream=False)
+        data = self._ollama_post(payload).json()
+        record_tokens("ollama", data.get("prompt_eval_count"), data.get("eval_count"))
+        return data.get("response", "").strip()
+
+    def _ollama_stream(self, system: str, user: str, expect_json: bool, usage: dict, cancel=None):
+        # routed (cancel given): fail fast so the router can fail over, instead of
+        # pulling the model and retrying with back-off for minutes
+        routed = cancel is not None
+        payload = self._ollama_payload(system, user, expect_json, stream=True, ensure_model=not routed)
+        r = self._ollama_post(payload, stream=True, retries=1 if routed else OLLAMA_RETRY, cancel=cancel)
+        if r is None:
+            return
+        with r:
+            for line in r.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                data = json.loads(line)
+                piece = data.get("response")
+                if piece:
+                    yield piece
+                if data.get("done"):
+                    usage.update(prompt=data.get("prompt_eval_count"), completion=data.get("eval_count"))
+                    break
 
     def _ollama_ensure_model(self, model: str) -> None:
         try:
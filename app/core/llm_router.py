@@ -0,0 +1,311 @@
+"""
+Latency-aware routing between the OpenAI and Ollama backends.
+
+With LLM_ROUTING=hedged every LLMClient call goes through one process-wide
+`HedgedRouter`:
+
+- the primary backend (Ollama if USE_LOCAL=1, else OpenAI) gets the request;
+- if it has not produced a first token within the LLM_HEDGE_PERCENTILE of its
+  recent time-to-first-token, the same request is sent to the other backend;
+- whichever streams a token first wins, and the loser is cancelled;
+- a primary error before the first token fails over immediately: routed
+  Ollama calls make one attempt with a short connect timeout and skip the
+  model pull, so a down server costs milliseconds, not minutes of retries;
+- a backend with too many recent errors is skipped (circuit open) until a
+  cool-down passes, then one probe request is let through.
+
+A loser that is still waiting for response headers is dropped as soon as the
+server answers; one that is streaming is closed on the next piece.
+"""
+from __future__ import annotations
+import contextvars
+import os
+import queue
+import threading
+import time
+from collections import Counter, deque
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from app.core.metrics import LLM_ROUTES, LLM_HEDGE_SAVED, LLM_BREAKER_OPEN
+
+LLM_ROUTING = os.getenv("LLM_ROUTING", "static")  # static | hedged
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_AFTER_SEC = float(os.getenv("LLM_HEDGE_AFTER_SEC", "2.0"))  # until enough samples exist
+LLM_HEDGE_MIN_SEC = float(os.getenv("LLM_HEDGE_MIN_SEC", "0.25"))  # never hedge sooner than this
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_STATS_WINDOW = int(os.getenv("LLM_STATS_WINDOW", "200"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))  # consecutive errors
+LLM_BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))  # over the stats window
+LLM_BREAKER_COOLDOWN_SEC = float(os.getenv("LLM_BREAKER_COOLDOWN_SEC", "30"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    xs = sorted(samples)
+    pos = (len(xs) - 1) * q / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(xs) - 1)
+    return xs[lo] + (xs[hi] - xs[lo]) * (pos - lo)
+
+
+class BackendStats:
+    """Rolling time-to-first-token samples and outcomes for one backend, plus its breaker."""
+
+    def __init__(self, name: str, window: int = LLM_STATS_WINDOW, failures: int = LLM_BREAKER_FAILURES,
+                 error_rate: float = LLM_BREAKER_ERROR_RATE, cooldown: float = LLM_BREAKER_COOLDOWN_SEC,
+                 min_samples: int = LLM_HEDGE_MIN_SAMPLES):
+        self.name = name
+        self.failures = failures
+        self.max_error_rate = error_rate
+        self.cooldown = cooldown
+        self.min_samples = min_samples
+        self.ttft: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def percentile(self, q: float) -> Optional[float]:
+        """TTFT percentile, or None while there are too few samples to trust it."""
+        with self._lock:
+            samples = list(self.ttft)
+        return _percentile(samples, q) if len(samples) >= self.min_samples else None
+
+    def error_rate(self) -> float:
+        with self._lock:
+            return (self.outcomes.count(False) / len(self.outcomes)) if self.outcomes else 0.0
+
+    def allow(self) -> bool:
+        """May a request go to this backend? Half-open lets exactly one probe through."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def success(self, ttft: float) -> None:
+        with self._lock:
+            self.ttft.append(ttft)
+            self.outcomes.append(True)
+            self.consecutive_failures = 0
+            if self.state != CLOSED:
+                self.state = CLOSED
+                LLM_BREAKER_OPEN.set(0, backend=self.name)
+
+    def failure(self) -> None:
+        with self._lock:
+            self.outcomes.append(False)
+            self.consecutive_failures += 1
+            rate = self.outcomes.count(False) / len(self.outcomes)
+            tripped = (self.consecutive_failures >= self.failures
+                       or (len(self.outcomes) >= self.min_samples and rate >= self.max_error_rate))
+            if self.state == HALF_OPEN or (self.state == CLOSED and tripped):
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                LLM_BREAKER_OPEN.set(1, backend=self.name)
+
+    def report(self) -> dict:
+        with self._lock:
+            samples = list(self.ttft)
+            outcomes = list(self.outcomes)
+            state, fails = self.state, self.consecutive_failures
+        return {
+            "samples": len(samples),
+            "ttft_p50_ms": 1000.0 * _percentile(samples, 50),
+            "ttft_p95_ms": 1000.0 * _percentile(samples, 95),
+            "ttft_p99_ms": 1000.0 * _percentile(samples, 99),
+            "error_rate": (outcomes.count(False) / len(outcomes)) if outcomes else 0.0,
+            "breaker": state,
+            "consecutive_failures": fails,
+        }
+
+
+class _Attempt:
+    """One backend's stream, consumed on its own thread into the request's event queue."""
+
+    def __init__(self, router: "HedgedRouter", client, backend: str, args: tuple, events: "queue.Queue"):
+        self.router = router
+        self.backend = backend
+        self.events = events
+        self.started = time.perf_counter()
+        self.first_at: Optional[float] = None
+        self.cancel = threading.Event()
+        self.lost_to: Optional["_Attempt"] = None  # set on a primary that the hedge beat
+        # each thread needs its own context copy to keep the route label and trace
+        ctx = contextvars.copy_context()
+        self.thread = threading.Thread(target=ctx.run, args=(self._run, client, args), daemon=True)
+        self.thread.start()
+
+    def _first_token(self) -> None:
+        self.first_at = time.perf_counter()
+        self.router.stats[self.backend].success(self.first_at - self.started)
+        winner = self.lost_to
+        if winner is not None and winner.first_at is not None:
+            LLM_HEDGE_SAVED.observe(max(0.0, self.first_at - winner.first_at))
+            self.router._saved(self.first_at - winner.first_at)
+
+    def _run(self, client, args) -> None:
+        # with `cancel` the backend makes a single attempt and stops waiting once cancelled
+        pieces = client.stream_from(self.backend, *args, cancel=self.cancel)
+        try:
+            for piece in pieces:
+                if self.first_at is None:
+                    self._first_token()
+                if self.cancel.is_set():
+                    return
+                self.events.put((self, "piece", piece))
+            if self.cancel.is_set():
+                return  # cancelled before the backend answered: neither a response nor an error
+            if self.first_at is None:
+                self._first_token()  # empty answer still counts as a response
+            self.events.put((self, "end", None))
+        except Exception as e:
+            self.router.stats[self.backend].failure()
+            self.events.put((self, "error", e))
+        finally:
+            pieces.close()  # drops the HTTP connection, stopping generation server-side
+
+
+class HedgedRouter:
+    def __init__(self, percentile: float = LLM_HEDGE_PERCENTILE, hedge_after: float = LLM_HEDGE_AFTER_SEC,
+                 min_delay: float = LLM_HEDGE_MIN_SEC, **stats_kwargs):
+        self.percentile = percentile
+        self.hedge_after = hedge_after
+        self.min_delay = min_delay
+        self.stats: Dict[str, BackendStats] = {
+            name: BackendStats(name, **stats_kwargs) for name in ("openai", "ollama")
+        }
+        self.decisions: Counter = Counter()
+        self.savings: Deque[float] = deque(maxlen=LLM_STATS_WINDOW)
+        self._lock = threading.Lock()
+
+    def hedge_delay(self, backend: str) -> float:
+        """How long the primary gets before the request is duplicated."""
+        p = self.stats[backend].percentile(self.percentile)
+        return max(self.min_delay, self.hedge_after if p is None else p)
+
+    def _plan(self, client) -> Tuple[str, Optional[str], str]:
+        """
+        (first backend, hedge candidate or None, decision label if already decided).
+        The hedge candidate's breaker is only consulted when the hedge actually fires,
+        so a half-open probe slot is never spent on a request that is not sent.
+        """
+        backends = client.backends
+        primary = client.backend if client.backend in backends else backends[0]
+        secondary = next((b for b in backends if b != primary), None)
+        if secondary is None:
+            return primary, None, "single"
+        if not self.stats[primary].allow():
+            if self.stats[secondary].allow():
+                return secondary, None, "breaker"
+            return primary, None, "breaker_all_open"  # nothing healthy; keep the configured one
+        return primary, secondary, ""
+
+    def _saved(self, seconds: float) -> None:
+        with self._lock:
+            self.savings.append(seconds)
+
+    def _decide(self, decision: str, backend: str) -> None:
+        LLM_ROUTES.inc(decision=decision, backend=backend)
+        with self._lock:
+            self.decisions[decision] += 1
+
+    def stream(self, client, system: str, user: str, expect_json: bool = False) -> Iterator[str]:
+        first, hedge, decision = self._plan(client)
+        args = (system, user, expect_json)
+        events: "queue.Queue" = queue.Queue()
+        attempts = [_Attempt(self, client, first, args, events)]
+        deadline = time.perf_counter() + self.hedge_delay(first) if hedge else None
+        hedged = failed_over = False
+        winner, head, errors = None, None, []
+        try:
+            while winner is None:
+                timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+                try:
+                    attempt, kind, payload = events.get(timeout=timeout)
+                except queue.Empty:
+                    deadline = None
+                    if self.stats[hedge].allow():
+                        attempts.append(_Attempt(self, client, hedge, args, events))
+                        hedged = True
+                    continue
+                if kind == "error":
+                    errors.append(payload)
+                    if hedge and len(attempts) == 1 and self.stats[hedge].allow():
+                        # primary failed before any output: go straight to the other backend
+                        attempts.append(_Attempt(self, client, hedge, args, events))
+                        deadline, failed_over = None, True
+                    elif len(errors) == len(attempts):
+                        self._decide("error", first)
+                        raise errors[-1]
+                    continue
+                winner, head = attempt, payload
+
+            if hedged and winner is not attempts[0]:
+                attempts[0].lost_to = winner
+            for a in attempts:
+                if a is not winner:
+                    a.cancel.set()
+            if failed_over:
+                decision = "failover"
+            elif hedged:
+                decision = "hedge_won" if winner is not attempts[0] else "hedge_lost"
+            self._decide(decision or "primary", winner.backend)
+
+            kind, payload = ("piece", head) if head is not None else ("end", None)
+            while True:
+                if kind == "end":
+                    return
+                if kind == "error":
+                    raise payload
+                yield payload
+                attempt, kind, payload = events.get()
+                while attempt is not winner:
+                    attempt, kind, payload = events.get()
+        finally:
+            for a in attempts:
+                a.cancel.set()
+
+    def report(self) -> dict:
+        with self._lock:
+            decisions = dict(self.decisions)
+            savings = list(self.savings)
+        fired = sum(decisions.get(k, 0) for k in ("hedge_won", "hedge_lost"))
+        return {
+            "mode": "hedged",
+            "hedge_percentile": self.percentile,
+            "hedge_delay_sec": {name: self.hedge_delay(name) for name in self.stats},
+            "backends": {name: s.report() for name, s in self.stats.items()},
+            "decisions": decisions,
+            "hedges": {
+                "fired": fired,
+                "won": decisions.get("hedge_won", 0),
+                "saved_samples": len(savings),
+                "saved_p50_ms": 1000.0 * _percentile(savings, 50),
+                "saved_p99_ms": 1000.0 * _percentile(savings, 99),
+                "saved_total_sec": sum(savings),
+            },
+        }
+
+
+_router: Optional[HedgedRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> HedgedRouter:
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = HedgedRouter()
+    return _router
@@ -0,0 +1,248 @@
+from __future__ import annotations
+import json
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from app.deps import METRICS_ENABLED, TRACE_PATH
+
+# seconds; spans range from sub-ms faiss searches to multi-minute Ollama calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+_route: ContextVar[str] = ContextVar("cvrc_route", default="")
+_trace: ContextVar[Optional[List[dict]]] = ContextVar("cvrc_trace", default=None)
+
+_registry: List["_Metric"] = []
+_trace_lock = threading.Lock()
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_num(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labels, k)} {_fmt_num(v)}" for k, v in items]
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        if not METRICS_ENABLED:
+            return
+        key = self._key(labels)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        out = []
+        for key, row in items:
+            cum = 0.0
+            for le, n in zip(self.buckets + (float("inf"),), row[:-2] + [row[-1] - sum(row[:-2])]):
+                cum += n
+                le_label = 'le="' + _fmt_num(le) + '"'
+                out.append(f"{self.name}_bucket{_fmt_labels(self.labels, key, le_label)} {_fmt_num(cum)}")
+            labels = _fmt_labels(self.labels, key)
+            out.append(f"{self.name}_sum{labels} {_fmt_num(row[-2])}")
+            out.append(f"{self.name}_count{labels} {_fmt_num(row[-1])}")
+        return out
+
+
+REQUEST_SECONDS = Histogram(
+    "cvrc_request_seconds", "End-to-end HTTP request latency.", ("route", "method", "status"))
+STAGE_SECONDS = Histogram(
+    "cvrc_stage_seconds", "Latency of a single pipeline stage.", ("stage", "route", "backend"))
+STAGE_ERRORS = Counter(
+    "cvrc_stage_errors_total", "Pipeline stages that raised.", ("stage", "route", "backend"))
+LLM_TOKENS = Counter(
+    "cvrc_llm_tokens_total", "LLM tokens reported by the backend.", ("route", "backend", "kind"))
+CACHE_REQUESTS = Counter(
+    "cvrc_cache_requests_total", "Cache lookups by outcome.", ("cache", "result"))
+LLM_ROUTES = Counter(
+    "cvrc_llm_route_decisions_total", "Hedged router decisions by outcome and serving backend.",
+    ("decision", "backend"))
+LLM_HEDGE_SAVED = Histogram(
+    "cvrc_llm_hedge_saved_seconds", "Time to first token saved when the hedge beat the primary.")
+LLM_BREAKER_OPEN = Gauge(
+    "cvrc_llm_breaker_open", "1 while a backend's circuit breaker is open (or half-open).", ("backend",))
+
+
+class Span:
+    """Times one pipeline stage; `duration` is set on exit even when metrics are off."""
+
+    __slots__ = ("stage", "backend", "start", "duration")
+
+    def __init__(self, stage: str, backend: str = ""):
+        self.stage = stage
+        self.backend = backend
+        self.start = 0.0
+        self.duration = 0.0
+
+    def __enter__(self) -> "Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.duration = time.perf_counter() - self.start
+        if not METRICS_ENABLED:
+            return
+        route = _route.get()
+        STAGE_SECONDS.observe(self.duration, stage=self.stage, route=route, backend=self.backend)
+        # GeneratorExit is a consumer closing a stream early, not a failure
+        failed = exc_type is not None and not issubclass(exc_type, GeneratorExit)
+        if failed:
+            STAGE_ERRORS.inc(stage=self.stage, route=route, backend=self.backend)
+        trace = _trace.get()
+        if trace is not None:
+            trace.append({
+                "stage": self.stage,
+                "backend": self.backend,
+                "start": self.start,
+                "duration": self.duration,
+                **({"error": exc_type.__name__} if failed else {}),
+            })
+
+
+def stage(name: str, backend: str = "") -> Span:
+    """`with stage("rerank", "cross-encoder"): ...` records a latency sample."""
+    return Span(name, backend)
+
+
+def record_tokens(backend: str, prompt: Optional[int], completion: Optional[int]) -> None:
+    route = _route.get()
+    if prompt:
+        LLM_TOKENS.inc(prompt, route=route, backend=backend, kind="prompt")
+    if completion:
+        LLM_TOKENS.inc(completion, route=route, backend=backend, kind="completion")
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+class RequestScope:
+    """Binds the route label (and a trace buffer if TRACE_PATH is set) for one request."""
+
+    def __init__(self, route: str, method: str = ""):
+        self.route = route
+        self.method = method
+        self.status = 500
+        self._tokens = None
+        self._start = 0.0
+        self._wall = 0.0
+
+    def __enter__(self) -> "RequestScope":
+        self._start = time.perf_counter()
+        self._wall = time.time()
+        self._tokens = (_route.set(self.route), _trace.set([] if TRACE_PATH else None))
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        duration = time.perf_counter() - self._start
+        REQUEST_SECONDS.observe(duration, route=self.route, method=self.method, status=str(self.status))
+        trace = _trace.get()
+        _route.reset(self._tokens[0])
+        _trace.reset(self._tokens[1])
+        if trace is not None:
+            _write_trace({
+                "trace_id": uuid.uuid4().hex,
+                "route": self.route,
+                "method": self.method,
+                "status": self.status,
+                "ts": self._wall,
+                "duration": duration,
+                "spans": [
+                    {**s, "start": s["start"] - self._start} for s in trace
+                ],
+            })
+
+
+def request_scope(route: str, method: str = "") -> RequestScope:
+    return RequestScope(route, method)
+
+
+def _write_trace(record: dict) -> None:
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    with _trace_lock:
+        with open(TRACE_PATH, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def render() -> str:
+    """All registered metrics in Prometheus text exposition format."""
+    return "\n".join(m.render() for m in _registry) + "\n"
@@ -5,6 +5,7 @@ from dataclasses import dataclass, asdict
 from typing import List, Literal, Optional, Tuple
 import json, uuid
 from pathlib import Path
+from app.core.metrics import stage
 
 
 @dataclass
@@ -36,7 +37,7 @@ def parse_pdf_to_blocks(pdf_path: Path, doc_id: str, store_path: Path) -> List[B
     blocks: List[Block] = []
 
     # ---- Text & headings via PyMuPDF ----
-    with fitz.open(str(pdf_path)) as doc:
+    with stage("parse_text", "pymupdf"), fitz.open(str(pdf_path)) as doc:
         for i, page in enumerate(doc):
             page_num = i + 1
             text_dict = page.get_text("dict")
@@ -65,7 +66,7 @@ def parse_pdf_to_blocks(pdf_path: Path, doc_id: str, store_path: Path) -> List[B
                         section_stack = section_stack[-3:]
 
     try:
-        with pdfplumber.open(str(pdf_path)) as pdf:
+        with stage("extract_tables", "pdfplumber"), pdfplumber.open(str(pdf_path)) as pdf:
             for i, page in enumerate(pdf.pages):
                 page_num = i + 1
                 try:
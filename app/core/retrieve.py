@@ -1,16 +1,50 @@
+import importlib.util
+import threading
 from app.core.embed import IndexStore
-from app.deps import TOP_K
+from app.deps import TOP_K, INFERENCE_SOCKET, RERANK_BACKEND
+from app.core.metrics import stage, record_cache
+
+# CrossEncoder is imported on first load so workers using the inference process never load torch
+HAVE_XENC = importlib.util.find_spec("sentence_transformers") is not None
+
+_RERANKERS: dict = {}
+_RERANKERS_LOCK = threading.Lock()
+
+
+def register_reranker(model_name: str, model) -> None:
+    """Serve `model_name` from an already-built reranker (anything with `.predict(pairs)`)."""
+    _RERANKERS[model_name] = model
+
+
+def load_reranker(model_name: str | None, local: bool = False):
+    """Process-wide reranker cache; a client for the shared inference process if INFERENCE_SOCKET is set."""
+    if not model_name:
+        return None
+    model = _RERANKERS.get(model_name)
+    record_cache("reranker", model is not None)
+    if model is not None:
+        return model
+    remote = bool(INFERENCE_SOCKET) and not local
+    if not remote and RERANK_BACKEND == "torch" and not HAVE_XENC:
+        return None
+    with _RERANKERS_LOCK:
+        model = _RERANKERS.get(model_name)
+        if model is None:
+            if remote:
+                from app.core.inference import RemoteReranker
+                model = RemoteReranker(model_name)
+            else:
+                from app.core.encoders import build_reranker, reranker_label
+                with stage("model_load", reranker_label(RERANK_BACKEND)):
+                    model = build_reranker(model_name, RERANK_BACKEND)
+            _RERANKERS[model_name] = model
+    return model
 
-try:
-    from sentence_transformers import CrossEncoder
-    HAVE_XENC = True
-except Exception:
-    HAVE_XENC = False
 
 class Retriever:
     def __init__(self, index: IndexStore, rerank_model: str | None = None):
         self.index = index
-        self.reranker = CrossEncoder(rerank_model) if (HAVE_XENC and rerank_model) else None
+        self.reranker = load_reranker(rerank_model)
 
     def retrieve(self, doc_id: str, question: str, k: int = TOP_K):
         prelim = self.index.search(doc_id, question, top_k=50)
@@ -18,7 +52,8 @@ class Retriever:
             return []
         if self.reranker:
             pairs = [(question, p["text"]) for p in prelim]
-            scores = self.reranker.predict(pairs)
+            with stage("rerank", getattr(self.reranker, "backend", "cross-encoder")):
+                scores = self.reranker.predict(pairs)
             for p, s in zip(prelim, scores):
                 p["rerank"] = float(s)
             prelim.sort(key=lambda x: x.get("rerank", 0), reverse=True)
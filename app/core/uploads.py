@@ -0,0 +1,210 @@
+"""
+Streamed PDF uploads: bytes go to a temp file in fixed-size chunks while the
+MD5 (the doc_id) is computed on the fly, so no upload is ever held in memory.
+
+Two entry points share the same finalize step:
+- `spool_upload` for a plain multipart POST /ingest/;
+- `UploadSessions` for the resumable protocol (create -> PUT chunks at an
+  offset -> complete), where an interrupted client asks for the current
+  offset and continues from there.
+"""
+from __future__ import annotations
+import fcntl
+import hashlib
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import AsyncIterator, Optional, Tuple
+
+from app.deps import PDF_DIR, UPLOAD_DIR, UPLOAD_CHUNK_BYTES
+
+
+class UploadError(Exception):
+    """Raised for unknown sessions or out-of-order chunks; `current` is the server-side offset."""
+
+    def __init__(self, message: str, current: Optional[int] = None):
+        super().__init__(message)
+        self.current = current
+
+
+def _hash_file(path: Path) -> str:
+    h = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(UPLOAD_CHUNK_BYTES), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+async def spool_upload(file) -> Tuple[str, Path, int]:
+    """
+    Copy a starlette UploadFile to a dotfile in PDF_DIR chunk by chunk.
+    Returns (doc_id, temp path, size); the caller renames or discards the file.
+    """
+    tmp = PDF_DIR / f".upload-{uuid.uuid4().hex}.part"
+    h = hashlib.md5()
+    size = 0
+    try:
+        with open(tmp, "wb") as out:
+            while True:
+                block = await file.read(UPLOAD_CHUNK_BYTES)
+                if not block:
+                    break
+                h.update(block)
+                out.write(block)
+                size += len(block)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return h.hexdigest(), tmp, size
+
+
+def finalize(tmp: Path, doc_id: str) -> Path:
+    """Atomically move a fully written upload to `{doc_id}.pdf`."""
+    dest = PDF_DIR / f"{doc_id}.pdf"
+    os.replace(tmp, dest)
+    return dest
+
+
+class UploadSessions:
+    """
+    Resumable uploads kept under UPLOAD_DIR as `{id}.part` (the bytes so far)
+    and `{id}.json` (filename, declared size, timestamps). The part file's
+    size is the offset, so a chunk cut off mid-transfer simply resumes from
+    whatever reached the disk. Writers hold an exclusive `flock` on the part
+    file, so two PUTs for one session (e.g. a client retry landing on another
+    worker) can never append at the same time. `complete` renames the part
+    file to `{id}.sealed` under that lock, so no PUT can reach the bytes it
+    hashes and ingests.
+    """
+
+    def __init__(self, root: Path = UPLOAD_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _paths(self, upload_id: str) -> Tuple[Path, Path]:
+        if not upload_id.isalnum():
+            raise UploadError(f"Unknown upload {upload_id}.")
+        return self.root / f"{upload_id}.part", self.root / f"{upload_id}.json"
+
+    def _sealed(self, upload_id: str) -> Path:
+        return self._paths(upload_id)[0].with_suffix(".sealed")
+
+    def create(self, filename: str, size: Optional[int] = None) -> dict:
+        upload_id = uuid.uuid4().hex
+        part, info = self._paths(upload_id)
+        part.touch()
+        now = time.time()
+        rec = {"upload_id": upload_id, "filename": filename, "size": size, "created_at": now, "updated_at": now}
+        info.write_text(json.dumps(rec))
+        return {**rec, "offset": 0}
+
+    def get(self, upload_id: str) -> dict:
+        part, info = self._paths(upload_id)
+        try:
+            rec = json.loads(info.read_text())
+            rec["offset"] = part.stat().st_size
+        except FileNotFoundError:
+            raise UploadError(f"Unknown upload {upload_id}.")
+        return rec
+
+    @staticmethod
+    def _lock(f, upload_id: str) -> None:
+        """Exclusive non-blocking lock on an open part file; shared by every worker process."""
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadError(f"Upload {upload_id} is already receiving a chunk.", os.fstat(f.fileno()).st_size)
+
+    async def append(self, upload_id: str, offset: int, body: AsyncIterator[bytes]) -> dict:
+        """Write `body` at `offset`, which must equal the bytes already received."""
+        rec = self.get(upload_id)
+        part, info = self._paths(upload_id)
+        try:
+            # no O_CREAT: a session discarded since get() must not be recreated
+            with os.fdopen(os.open(part, os.O_WRONLY | os.O_APPEND), "ab") as out:
+                self._lock(out, upload_id)
+                # checked under the lock: another writer may have appended since get(),
+                # or complete() may have sealed the file since it was opened
+                st = os.fstat(out.fileno())
+                if not os.path.samestat(st, os.stat(part)):
+                    raise FileNotFoundError(part)
+                current = st.st_size
+                if offset != current:
+                    raise UploadError(f"Offset {offset} does not match {current} bytes received.", current)
+                try:
+                    async for block in body:
+                        out.write(block)
+                        if rec["size"] is not None and out.tell() > rec["size"]:
+                            out.truncate(offset)  # drop this chunk so a corrected retry can resume
+                            raise UploadError(f"Upload exceeds its declared size of {rec['size']} bytes.", offset)
+                finally:
+                    rec["updated_at"] = time.time()
+                    rec.pop("offset", None)
+                    info.write_text(json.dumps(rec))
+        except FileNotFoundError:
+            raise UploadError(f"Unknown upload {upload_id}.")
+        return self.get(upload_id)
+
+    def complete(self, upload_id: str) -> Tuple[str, Path, dict]:
+        """
+        Seal the assembled file and hash it in chunks; returns (doc_id, sealed
+        path, session record). The caller renames or discards the sealed file.
+        """
+        rec = self.get(upload_id)
+        part, _ = self._paths(upload_id)
+        sealed = self._sealed(upload_id)
+        try:
+            with open(part, "rb") as f:
+                self._lock(f, upload_id)  # not while a PUT is still appending
+                rec["offset"] = os.fstat(f.fileno()).st_size
+                if rec["size"] is not None and rec["offset"] != rec["size"]:
+                    raise UploadError(f"Upload has {rec['offset']} of {rec['size']} bytes.", rec["offset"])
+                # from here on a PUT finds no part file, so the bytes hashed are the bytes ingested
+                os.replace(part, sealed)
+        except FileNotFoundError:
+            raise UploadError(f"Unknown upload {upload_id}.")
+        return _hash_file(sealed), sealed, rec
+
+    def discard(self, upload_id: str) -> bool:
+        found = False
+        for path in (*self._paths(upload_id), self._sealed(upload_id)):
+            try:
+                path.unlink()
+                found = True
+            except FileNotFoundError:
+                pass
+        return found
+
+    def gc(self, stale_after: float = 86400.0, dry_run: bool = False) -> list:
+        """Drop sessions (and stray single-shot spools) idle for `stale_after` seconds."""
+        removed = []
+        cutoff = time.time() - stale_after
+        for info in self.root.glob("*.json"):
+            upload_id = info.stem
+            try:
+                # not get(): a sealed session being ingested has no part file but is live
+                rec = json.loads(info.read_text())
+            except (OSError, ValueError):
+                rec = {"updated_at": 0}
+            if rec["updated_at"] < cutoff:
+                removed.append(upload_id)
+                if not dry_run:
+                    self.discard(upload_id)
+        for spool in PDF_DIR.glob(".upload-*.part"):
+            if spool.stat().st_mtime < cutoff:
+                removed.append(spool.name)
+                if not dry_run:
+                    spool.unlink(missing_ok=True)
+        return removed
+
+
+_sessions: Optional[UploadSessions] = None
+
+
+def get_sessions() -> UploadSessions:
+    global _sessions
+    if _sessions is None:
+        _sessions = UploadSessions()
+    return _sessions
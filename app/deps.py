@@ -5,12 +5,14 @@ from dotenv import load_dotenv
 load_dotenv()
 
 BASE_DIR = Path(__file__).resolve().parent.parent
-DATA_DIR = BASE_DIR.parent / "data"
+DATA_DIR = Path(os.getenv("DATA_DIR", str(BASE_DIR.parent / "data")))
 PDF_DIR = DATA_DIR / "pdfs"
 STORE_DIR = DATA_DIR / "store"
 INDEX_DIR = DATA_DIR / "index"
+UPLOAD_DIR = DATA_DIR / "uploads"  # resumable upload sessions
+CATALOG_PATH = DATA_DIR / "catalog.sqlite3"
 
-for d in [PDF_DIR, STORE_DIR, INDEX_DIR]:
+for d in [PDF_DIR, STORE_DIR, INDEX_DIR, UPLOAD_DIR]:
     d.mkdir(parents=True, exist_ok=True)
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
@@ -18,5 +20,27 @@ MODEL_PRIMARY = os.getenv("MODEL_PRIMARY", "openai/gpt-4o-mini")
 MODEL_LOCAL = os.getenv("MODEL_LOCAL", "ollama/llama3.1:8b-instruct")
 EMBED_MODEL = os.getenv("EMBED_MODEL", "BAAI/bge-m3")
 RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch")  # torch | onnx | onnx-int8
+RERANK_BACKEND = os.getenv("RERANK_BACKEND", "torch")  # torch | onnx | onnx-int8
+ENCODER_THREADS = int(os.getenv("ENCODER_THREADS", "0"))  # intra-op threads; 0 = runtime default
+ENCODER_MAX_BATCH_TOKENS = int(os.getenv("ENCODER_MAX_BATCH_TOKENS", "16384"))  # padded tokens per batch
+MODEL_CACHE_DIR = Path(os.getenv("MODEL_CACHE_DIR", str(DATA_DIR / "models")))  # ONNX exports
 TOP_K = int(os.getenv("TOP_K", "8"))
-USE_LOCAL = os.getenv("USE_LOCAL", "0") == "1"
\ No newline at end of file
+USE_LOCAL = os.getenv("USE_LOCAL", "0") == "1"
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+TRACE_PATH = os.getenv("TRACE_PATH", "")  # JSONL file of per-request spans; empty = off
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1 << 20)))  # read/write/hash block size
+
+# Multi-worker serving: mmap'd per-doc indexes + one shared model process
+INDEX_MMAP = os.getenv("INDEX_MMAP", "1") == "1"
+INDEX_CACHE_SIZE = int(os.getenv("INDEX_CACHE_SIZE", "64"))  # open mmap'd indexes kept per worker
+INFERENCE_SOCKET = os.getenv("INFERENCE_SOCKET", "")  # unix socket path or host:port; empty = in-process models
+INFERENCE_AUTHKEY = os.getenv("INFERENCE_AUTHKEY", "")  # empty: generated into <socket>.key (unix sockets only)
+INFERENCE_CONNECT_TIMEOUT = float(os.getenv("INFERENCE_CONNECT_TIMEOUT", "120"))  # seconds to wait for a starting server
+
+# Near-duplicate detection at ingest: reuse vectors of an earlier version of the same paper
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "1") == "1"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))  # estimated Jaccard to link a parent
+DEDUP_NUM_PERM = int(os.getenv("DEDUP_NUM_PERM", "128"))  # MinHash signature length
+DEDUP_BANDS = int(os.getenv("DEDUP_BANDS", "16"))  # LSH bands; rows per band = NUM_PERM / BANDS
+DEDUP_SHINGLE = int(os.getenv("DEDUP_SHINGLE", "5"))  # words per shingle
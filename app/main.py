@@ -1,6 +1,10 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import ingest, ask, extract
+from fastapi.responses import PlainTextResponse
+from starlette.routing import Match
+from app.routes import ingest, ask, extract, documents, llm
+from app.deps import METRICS_ENABLED
+from app.core import metrics
 
 app = FastAPI(title="CV Research Copilot", version="0.1.0")
 
@@ -15,7 +19,32 @@ app.add_middleware(
 app.include_router(ingest.router, prefix="/ingest", tags=["ingest"])
 app.include_router(ask.router, prefix="/ask", tags=["ask"])
 app.include_router(extract.router, prefix="/extract", tags=["extract"])
+app.include_router(documents.router, prefix="/documents", tags=["documents"])
+app.include_router(llm.router, prefix="/llm", tags=["llm"])
+
+
+def _route_template(request: Request) -> str:
+    """Route path template (e.g. "/ask/") so metric labels stay low-cardinality."""
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(route, "path", request.url.path)
+    return "unmatched"
+
+
+@app.middleware("http")
+async def instrument(request: Request, call_next):
+    if not METRICS_ENABLED:
+        return await call_next(request)
+    with metrics.request_scope(_route_template(request), request.method) as scope:
+        response = await call_next(request)
+        scope.status = response.status_code
+    return response
 
 @app.get("/")
 def root():
-    return {"ok": True, "service": "cv-research-copilot"}
\ No newline at end of file
+    return {"ok": True, "service": "cv-research-copilot"}
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
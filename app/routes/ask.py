@@ -5,12 +5,15 @@ from app.core.embed import IndexStore
 from app.core.retrieve import Retriever
 from app.core.prompts import QA_SYSTEM, QA_USER_TEMPLATE
 from app.core.llm import LLMClient
+from app.routes.documents import require_ready
 
 router = APIRouter()
 
 @router.post("/", response_model=AskResponse)
 async def ask(req: AskRequest):
-    index = IndexStore(EMBED_MODEL, INDEX_DIR)
+    doc = require_ready(req.doc_id)
+    # search with the model the doc was indexed with, even if EMBED_MODEL changed since
+    index = IndexStore(doc.get("embed_model") or EMBED_MODEL, INDEX_DIR)
     retriever = Retriever(index, RERANK_MODEL)
     chunks = retriever.retrieve(req.doc_id, req.question, k=TOP_K)
     if not chunks:
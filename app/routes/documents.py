@@ -0,0 +1,60 @@
+from fastapi import APIRouter, HTTPException
+from typing import Optional
+from app.schemas import DocumentRecord, DocumentList, GCResponse
+from app.core.catalog import get_catalog, remove_artifacts, READY
+from app.core.uploads import get_sessions
+
+router = APIRouter()
+
+
+def require_ready(doc_id: str) -> dict:
+    """Catalog lookup for /ask and /extract: 404 if unknown, 409 if not fully indexed."""
+    rec = get_catalog().get(doc_id)
+    if rec is None:
+        raise HTTPException(404, f"Unknown doc_id {doc_id}. Did you ingest the PDF?")
+    if rec["status"] != READY:
+        detail = f"Document {doc_id} is {rec['status']}"
+        if rec.get("error"):
+            detail += f": {rec['error']}"
+        raise HTTPException(409, detail + ".")
+    return rec
+
+
+@router.get("/", response_model=DocumentList)
+def list_documents(status: Optional[str] = None):
+    return DocumentList(documents=get_catalog().list(status=status))
+
+
+@router.get("/{doc_id}", response_model=DocumentRecord)
+def get_document(doc_id: str):
+    rec = get_catalog().get(doc_id)
+    if rec is None:
+        raise HTTPException(404, f"Unknown doc_id {doc_id}.")
+    return rec
+
+
+@router.get("/{doc_id}/versions", response_model=DocumentList)
+def document_versions(doc_id: str):
+    """Every version linked to this doc by near-duplicate detection at ingest, oldest first."""
+    catalog = get_catalog()
+    if catalog.get(doc_id) is None:
+        raise HTTPException(404, f"Unknown doc_id {doc_id}.")
+    return DocumentList(documents=catalog.versions(doc_id))
+
+
+@router.delete("/{doc_id}")
+def delete_document(doc_id: str):
+    """Drop the catalog row first so concurrent requests stop routing to it, then the files."""
+    catalog = get_catalog()
+    if catalog.get(doc_id) is None:
+        raise HTTPException(404, f"Unknown doc_id {doc_id}.")
+    catalog.delete(doc_id)
+    freed = remove_artifacts(doc_id)
+    return {"doc_id": doc_id, "deleted": True, "freed_bytes": freed}
+
+
+@router.post("/gc", response_model=GCResponse)
+def garbage_collect(dry_run: bool = False, stale_after: float = 3600.0):
+    report = get_catalog().gc(stale_after=stale_after, dry_run=dry_run)
+    report["uploads_removed"] = get_sessions().gc(stale_after=stale_after, dry_run=dry_run)
+    return GCResponse(dry_run=dry_run, **report)
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException
+from contextlib import closing
 import json
 import re
 import requests
@@ -18,6 +19,8 @@ from app.core.embed import IndexStore
 from app.core.retrieve import Retriever
 from app.core.prompts import JSON_SYSTEM, JSON_USER_TEMPLATE, JSON_SCHEMA_STR
 from app.core.llm import LLMClient
+from app.core.jsonstream import StreamingJSONParser
+from app.routes.documents import require_ready
 
 
 def _coerce_str(x) -> str:
@@ -222,11 +225,25 @@ def parse_json_safely(text: str) -> dict:
 
     raise ValueError("could not parse JSON from model output")
 
+
+def parse_model_output(parser: StreamingJSONParser, raw: str) -> dict:
+    """Normalized PaperJSON dict from the streamed output; 502 when nothing can be recovered."""
+    try:
+        try:
+            data = parser.result()
+        except ValueError:
+            data = parse_json_safely(raw)
+        return normalize_paperjson(data)
+    except Exception:
+        snippet = (raw or "")[:400]
+        raise HTTPException(502, f"Model did not return clean JSON. First 400 chars:\n{snippet}")
+
 router = APIRouter()
 
 @router.post("/", response_model=ExtractResponse)
 async def extract(req: ExtractRequest):
-    index = IndexStore(EMBED_MODEL, INDEX_DIR)
+    doc = require_ready(req.doc_id)
+    index = IndexStore(doc.get("embed_model") or EMBED_MODEL, INDEX_DIR)
     retriever = Retriever(index, RERANK_MODEL)
 
     q = "methods loss function architecture dataset split metric table AP mAP mIoU results ablation sota"
@@ -248,8 +265,16 @@ async def extract(req: ExtractRequest):
 
     llm = LLMClient(MODEL_PRIMARY, MODEL_LOCAL, USE_LOCAL, OPENAI_API_KEY)
 
+    # stream tokens and stop generation as soon as the top-level object closes
+    parser = StreamingJSONParser()
+    pieces = []
     try:
-        raw = llm.generate(system, user, expect_json=True)
+        with closing(llm.stream(system, user, expect_json=True)) as stream:
+            for piece in stream:
+                pieces.append(piece)
+                parser.feed(piece)
+                if parser.done:
+                    break
     except requests.HTTPError as e:
         if e.response is not None and e.response.status_code == 401:
             raise HTTPException(
@@ -258,12 +283,6 @@ async def extract(req: ExtractRequest):
             )
         raise
 
-    try:
-        data = parse_json_safely(raw)
-        data = normalize_paperjson(data)
-    except Exception:
-        snippet = (raw or "")[:400]
-        raise HTTPException(502, f"Model did not return clean JSON. First 400 chars:\n{snippet}")
-
+    data = parse_model_output(parser, "".join(pieces))
     pj = PaperJSON.model_validate(data)
     return ExtractResponse(data=pj)
\ No newline at end of file
@@ -1,20 +1,132 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request
+from fastapi.responses import JSONResponse
 from pathlib import Path
-import hashlib
-import fitz  
-from app.schemas import IngestResponse
-from app.deps import PDF_DIR, STORE_DIR, INDEX_DIR, EMBED_MODEL
+import fitz
+from app.schemas import IngestResponse, UploadCreate, UploadSession
+from app.deps import (STORE_DIR, INDEX_DIR, EMBED_MODEL, EMBED_BACKEND, RERANK_MODEL, UPLOAD_CHUNK_BYTES,
+                      DEDUP_ENABLED)
 from app.core.parsing import parse_pdf_to_blocks
 from app.core.chunking import chunk_blocks
 from app.core.embed import IndexStore
+from app.core import dedup
+from app.core.metrics import stage
+from app.core.catalog import get_catalog, remove_artifacts, artifact_sizes, INDEXING, READY
+from app.core.uploads import spool_upload, finalize, get_sessions, UploadError
 
 router = APIRouter()
 
-def _hash_file(contents: bytes) -> str:
-    """Stable doc_id based on file content."""
-    h = hashlib.md5()
-    h.update(contents)
-    return h.hexdigest()
+
+def _count_pages(pdf_path: Path):
+    """Return (page count, seconds taken); 0 pages if PyMuPDF cannot open the file."""
+    with stage("count_pages", "pymupdf") as span:
+        try:
+            with fitz.open(str(pdf_path)) as doc:
+                pages = len(doc)
+        except Exception:
+            pages = 0
+    return pages, span.duration
+
+
+def _find_parent(doc_id: str, blocks: list):
+    """
+    (signature, band keys, parent record or None, similarity) for a freshly
+    parsed doc. A parent is an already-indexed near-duplicate embedded with the
+    current model and backend (int8 and fp32 vectors differ), so its vectors can
+    stand in for identical chunks.
+    """
+    # blocks are single lines: join them so shingles span line breaks, as they do within a chunk
+    sig = dedup.signature(["\n".join(b.get("text", "") for b in blocks)])
+    if sig is None:
+        return None, [], None, None
+    keys = dedup.band_keys(sig)
+    if not DEDUP_ENABLED:
+        return sig, keys, None, None
+    catalog = get_catalog()
+    candidates = catalog.near_duplicates(keys, exclude=doc_id)
+    for other in list(candidates):
+        rec = catalog.get(other)
+        if rec is None or (rec.get("embed_model"), rec.get("embed_backend")) != (EMBED_MODEL, EMBED_BACKEND):
+            del candidates[other]
+    match = dedup.best_match(sig, candidates)
+    if match is None:
+        return sig, keys, None, None
+    return sig, keys, catalog.get(match[0]), match[1]
+
+
+def _response(rec: dict, **extra) -> IngestResponse:
+    return IngestResponse(doc_id=rec["doc_id"], pages=rec["pages"] or 0, parent_doc_id=rec.get("parent_doc_id"),
+                          similarity=rec.get("similarity"), reused_chunks=rec.get("reused_chunks") or 0,
+                          embedded_chunks=rec.get("embedded_chunks") or 0, **extra)
+
+
+def _ingest_file(tmp_path: Path, doc_id: str, filename: str, timings: dict) -> IngestResponse:
+    """
+    Shared tail of both upload paths: `tmp_path` is a fully written upload whose
+    MD5 is `doc_id`. Already-indexed content is dropped without re-parsing;
+    otherwise the file is renamed into place and parsed, chunked and indexed.
+    If a near-duplicate paper is already indexed, its chunks anchor the new
+    doc's chunking, chunks it shares verbatim reuse its vectors, and the new
+    doc records it as its parent version.
+    """
+    catalog = get_catalog()
+    if catalog.is_ready(doc_id):
+        tmp_path.unlink(missing_ok=True)
+        return _response(catalog.get(doc_id), cached=True)
+
+    current = catalog.begin(doc_id, filename)
+    if current is not None:
+        # never touch files another request is still writing
+        tmp_path.unlink(missing_ok=True)
+        if current["status"] == READY:
+            return _response(current, cached=True)
+        raise HTTPException(409, f"Document {doc_id} is already being ingested ({current['status']}).")
+    try:
+        with stage("save") as span:
+            pdf_path = finalize(tmp_path, doc_id)
+        timings["save"] = span.duration
+        pages, timings["count_pages"] = _count_pages(pdf_path)
+
+        blocks_path = STORE_DIR / f"{doc_id}.blocks.jsonl"
+        chunks_path = STORE_DIR / f"{doc_id}.chunks.jsonl"
+        with stage("parse") as span:
+            blocks = [b.__dict__ for b in parse_pdf_to_blocks(pdf_path, doc_id, blocks_path)]
+        timings["parse"] = span.duration
+
+        index = IndexStore(EMBED_MODEL, INDEX_DIR)
+        with stage("dedup", "minhash") as span:
+            sig, keys, parent, similarity = _find_parent(doc_id, blocks)
+            reuse = {}
+            if parent is not None:
+                try:
+                    reuse = index.vectors_by_text(parent["doc_id"])
+                except Exception:
+                    parent, similarity = None, None  # parent vanished mid-ingest; embed everything
+        timings["dedup"] = span.duration
+        with stage("chunk") as span:
+            # the parent's chunks anchor the boundaries, so unchanged runs of blocks chunk identically
+            chunks = [c.__dict__ for c in chunk_blocks(blocks, doc_id, chunks_path, anchors=list(reuse))]
+        timings["chunk"] = span.duration
+        catalog.upsert(doc_id, status=INDEXING, pages=pages, n_blocks=len(blocks),
+                       n_chunks=len(chunks), timings=timings)
+
+        with stage("index") as span:
+            dim = index.build(doc_id, chunks, reuse=reuse)
+        timings["index"] = span.duration
+        reused = sum(c["text"] in reuse for c in chunks)
+    except Exception as e:
+        # never leave a half-written doc behind for /ask to trip over
+        tmp_path.unlink(missing_ok=True)
+        remove_artifacts(doc_id)
+        catalog.fail(doc_id, f"{type(e).__name__}: {e}")
+        raise
+
+    if sig is not None:
+        catalog.put_signature(doc_id, sig.tobytes(), keys)
+    catalog.upsert(doc_id, status=READY, embed_model=EMBED_MODEL, embed_dim=dim, embed_backend=EMBED_BACKEND,
+                   rerank_model=RERANK_MODEL, bytes=artifact_sizes(doc_id), timings=timings,
+                   parent_doc_id=parent["doc_id"] if parent else None, similarity=similarity,
+                   reused_chunks=reused, embedded_chunks=len(chunks) - reused)
+    return _response(catalog.get(doc_id))
 
 
 @router.post("/", response_model=IngestResponse)
@@ -23,25 +135,74 @@ async def ingest_pdf(file: UploadFile = File(...)):
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Please upload a PDF file.")
 
-    pdf_bytes = await file.read()
-    if not pdf_bytes:
+    with stage("upload") as span:
+        doc_id, tmp_path, size = await spool_upload(file)
+    if not size:
+        tmp_path.unlink(missing_ok=True)
         raise HTTPException(status_code=400, detail="Empty file.")
+    return _ingest_file(tmp_path, doc_id, file.filename, {"upload": span.duration})
+
 
-    doc_id = _hash_file(pdf_bytes)
-    pdf_path = PDF_DIR / f"{doc_id}.pdf"
-    pdf_path.write_bytes(pdf_bytes)
-    blocks_path = STORE_DIR / f"{doc_id}.blocks.jsonl"
-    chunks_path = STORE_DIR / f"{doc_id}.chunks.jsonl"
-    blocks = [b.__dict__ for b in parse_pdf_to_blocks(pdf_path, doc_id, blocks_path)]
-    chunks = [c.__dict__ for c in chunk_blocks(blocks, doc_id, chunks_path)]
+# ------------------------- resumable uploads -------------------------
 
-    index = IndexStore(EMBED_MODEL, INDEX_DIR)
-    index.build(doc_id, chunks)
+def _session(rec: dict) -> UploadSession:
+    return UploadSession(chunk_bytes=UPLOAD_CHUNK_BYTES, **rec)
 
+
+def _upload_error(e: UploadError) -> JSONResponse:
+    """404 for unknown sessions; 409 with the server offset so the client can resume."""
+    if e.current is None:
+        return JSONResponse({"detail": str(e)}, status_code=404)
+    return JSONResponse({"detail": str(e), "offset": e.current}, status_code=409,
+                        headers={"Upload-Offset": str(e.current)})
+
+
+@router.post("/uploads", response_model=UploadSession)
+def create_upload(body: UploadCreate):
+    """Open a resumable upload; send the bytes with PUT /ingest/uploads/{id}?offset=N."""
+    if not body.filename.lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="Please upload a PDF file.")
+    return _session(get_sessions().create(body.filename, body.size))
+
+
+@router.get("/uploads/{upload_id}", response_model=UploadSession)
+def upload_status(upload_id: str):
+    """Where to resume: `offset` is the number of bytes the server has."""
+    try:
+        return _session(get_sessions().get(upload_id))
+    except UploadError as e:
+        return _upload_error(e)
+
+
+@router.put("/uploads/{upload_id}", response_model=UploadSession)
+async def upload_chunk(upload_id: str, offset: int, request: Request):
+    """Append the raw request body at `offset`; streamed to disk, never buffered whole."""
     try:
-        with fitz.open(str(pdf_path)) as doc:
-            pages = len(doc)
-    except Exception:
-        pages = 0
+        return _session(await get_sessions().append(upload_id, offset, request.stream()))
+    except UploadError as e:
+        return _upload_error(e)
+
+
+@router.post("/uploads/{upload_id}/complete", response_model=IngestResponse)
+def complete_upload(upload_id: str):
+    """Hash the assembled file and ingest it (or return the existing doc if already indexed)."""
+    sessions = get_sessions()
+    try:
+        with stage("upload_hash") as span:
+            doc_id, sealed_path, rec = sessions.complete(upload_id)
+    except UploadError as e:
+        return _upload_error(e)
+    try:
+        if not rec["offset"]:
+            raise HTTPException(status_code=400, detail="Empty file.")
+        return _ingest_file(sealed_path, doc_id, rec["filename"], {"upload_hash": span.duration})
+    finally:
+        # the sealed file was renamed or removed; drop the session either way
+        sessions.discard(upload_id)
+
 
-    return IngestResponse(doc_id=doc_id, pages=pages)
\ No newline at end of file
+@router.delete("/uploads/{upload_id}")
+def abort_upload(upload_id: str):
+    if not get_sessions().discard(upload_id):
+        raise HTTPException(404, f"Unknown upload {upload_id}.")
+    return {"upload_id": upload_id, "deleted": True}
@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from app.deps import USE_LOCAL
+from app.core.llm_router import LLM_ROUTING, get_router
+
+router = APIRouter()
+
+
+@router.get("/routing")
+def routing_report():
+    """Per-backend TTFT percentiles, error rates, breaker state and hedge outcomes (this process)."""
+    if LLM_ROUTING != "hedged":
+        return {"mode": LLM_ROUTING, "backend": "ollama" if USE_LOCAL else "openai"}
+    return get_router().report()
@@ -1,9 +1,25 @@
 from pydantic import BaseModel, Field
-from typing import List, Literal, Optional
+from typing import Dict, List, Literal, Optional
 
 class IngestResponse(BaseModel):
     doc_id: str
     pages: int
+    cached: bool = False  # same content already indexed; nothing was re-parsed
+    parent_doc_id: Optional[str] = None  # earlier version this doc was detected as a near-duplicate of
+    similarity: Optional[float] = None  # estimated Jaccard similarity to the parent
+    reused_chunks: int = 0  # chunks whose vectors were copied from the parent
+    embedded_chunks: int = 0  # chunks that had to be embedded
+
+class UploadCreate(BaseModel):
+    filename: str
+    size: Optional[int] = Field(default=None, ge=0)  # total bytes, if known up front
+
+class UploadSession(BaseModel):
+    upload_id: str
+    filename: str
+    size: Optional[int] = None
+    offset: int  # bytes received so far; the next PUT must start here
+    chunk_bytes: int  # suggested PUT size
 
 class AskRequest(BaseModel):
     doc_id: str
@@ -30,4 +46,37 @@ class PaperJSON(BaseModel):
     ablations: List[dict] = []
 
 class ExtractResponse(BaseModel):
-    data: PaperJSON
\ No newline at end of file
+    data: PaperJSON
+
+class DocumentRecord(BaseModel):
+    doc_id: str
+    filename: Optional[str] = None
+    status: Literal["pending", "parsing", "indexing", "ready", "failed"]
+    error: Optional[str] = None
+    pages: Optional[int] = None
+    n_blocks: Optional[int] = None
+    n_chunks: Optional[int] = None
+    embed_model: Optional[str] = None
+    embed_dim: Optional[int] = None
+    embed_backend: Optional[str] = None  # torch | onnx | onnx-int8
+    rerank_model: Optional[str] = None
+    parent_doc_id: Optional[str] = None
+    similarity: Optional[float] = None
+    reused_chunks: Optional[int] = None
+    embedded_chunks: Optional[int] = None
+    bytes: Dict[str, int] = {}     # artifact kind -> size on disk
+    timings: Dict[str, float] = {}  # ingest stage -> seconds
+    created_at: float
+    updated_at: float
+
+class DocumentList(BaseModel):
+    documents: List[DocumentRecord]
+
+class GCResponse(BaseModel):
+    dry_run: bool
+    adopted: List[str] = []
+    orphans_removed: List[str] = []
+    purged: List[str] = []
+    marked_failed: List[str] = []
+    uploads_removed: List[str] = []
+    freed_bytes: int = 0
\ No newline at end of file
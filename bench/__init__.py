@@ -0,0 +1,10 @@
+"""
+Offline benchmarks for the ingest / retrieval / LLM pipeline.
+
+Everything runs on CPU without network access: papers are synthesized with
+PyMuPDF, embedders and rerankers can be swapped for small or fake models,
+and the LLM is a local fake server speaking the Ollama/OpenAI wire formats.
+
+    python -m bench.run --out bench/results/baseline.json
+    python -m bench.run --compare bench/results/baseline.json
+"""
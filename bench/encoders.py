@@ -0,0 +1,156 @@
+"""
+Compare encoder backends (torch fp32 vs ONNX Runtime fp32 / dynamic int8) on
+synthetic-paper chunks: speed, and retrieval quality relative to torch.
+
+    python -m bench.encoders --embedder BAAI/bge-m3 --reranker cross-encoder/ms-marco-MiniLM-L-6-v2
+    python -m bench.encoders --backends torch,onnx-int8 --threads 4 --pages 48
+
+Models must be in the local Hugging Face cache (or be local directories).
+ONNX exports are written to --model-cache and reused across runs.
+
+Per backend it reports chunk-embedding throughput (ingest), per-query encode
+and rerank latency, and the speedup of each over torch. Quality is measured
+against torch on the same inputs: mean cosine between embeddings, recall@k
+of the top-k chunks by exact inner product, recall@k after reranking the
+top 50, and the largest rerank score difference.
+"""
+from __future__ import annotations
+import argparse
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from bench.harness import environment, run_case, write_report
+
+
+def _chunks(workdir: Path, pages: int) -> list:
+    from app.core.parsing import parse_pdf_to_blocks
+    from app.core.chunking import chunk_blocks
+    from bench.synth import make_paper_pdf
+
+    pdf = make_paper_pdf(workdir / "paper.pdf", pages)
+    blocks = [b.__dict__ for b in parse_pdf_to_blocks(pdf, "bench", workdir / "blocks.jsonl")]
+    return [c["text"] for c in (c.__dict__ for c in chunk_blocks(blocks, "bench", workdir / "chunks.jsonl"))]
+
+
+def _topk(scores: np.ndarray, k: int) -> np.ndarray:
+    return np.argsort(-scores, kind="stable")[:k]
+
+
+def _recall(ref: list, got: list) -> float:
+    return float(np.mean([len(set(r) & set(g)) / max(len(r), 1) for r, g in zip(ref, got)]))
+
+
+def bench_backend(backend: str, args, texts: list, queries: list) -> dict:
+    from app.core.encoders import build_encoder, build_reranker, encoder_label, reranker_label
+    from app.core.metrics import stage
+
+    out: dict = {}
+    with stage("model_load", encoder_label(backend)) as span:
+        encoder = build_encoder(args.embedder, backend)
+    out["embed.load_s"] = span.duration
+    out["embed.build"] = run_case(lambda: encoder.encode(texts, normalize_embeddings=True), args.repeat,
+                                  items=len(texts))
+    it = iter(range(10 ** 9))
+    out["embed.query"] = run_case(
+        lambda: encoder.encode([queries[next(it) % len(queries)]], normalize_embeddings=True),
+        args.repeat * len(queries))
+    doc_vecs = encoder.encode(texts, normalize_embeddings=True)
+    query_vecs = encoder.encode(queries, normalize_embeddings=True)
+    out["_vectors"] = (doc_vecs, query_vecs)
+
+    if args.reranker != "none":
+        with stage("model_load", reranker_label(backend)) as span:
+            reranker = build_reranker(args.reranker, backend)
+        out["rerank.load_s"] = span.duration
+        # rerank the same candidates for every backend: torch's top 50 are filled in by main()
+        out["_reranker"] = reranker
+    return out
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--embedder", default="BAAI/bge-m3")
+    ap.add_argument("--reranker", default="cross-encoder/ms-marco-MiniLM-L-6-v2", help="model name or 'none'")
+    ap.add_argument("--backends", default="torch,onnx,onnx-int8", help="first one is the quality reference")
+    ap.add_argument("--threads", type=int, default=0, help="ENCODER_THREADS (0 = runtime default)")
+    ap.add_argument("--pages", type=int, default=16)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--k", type=int, default=8)
+    ap.add_argument("--model-cache", type=Path, default=Path("data/models"))
+    ap.add_argument("--out", type=Path, default=Path("bench/results/encoders.json"))
+    args = ap.parse_args(argv)
+
+    workdir = Path(tempfile.mkdtemp(prefix="cvrc-encoders-"))
+    # must run before app/ is imported: app.deps reads env at import time
+    os.environ["DATA_DIR"] = str(workdir / "data")
+    os.environ["MODEL_CACHE_DIR"] = str(args.model_cache.resolve())
+    os.environ["ENCODER_THREADS"] = str(args.threads)
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+    os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+    from bench.synth import QUERIES
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    texts = _chunks(workdir, args.pages)
+    queries = list(QUERIES)
+    print(f"{len(texts)} chunks, {len(queries)} queries, backends {backends}", flush=True)
+
+    raw = {b: bench_backend(b, args, texts, queries) for b in backends}
+    ref = raw[backends[0]]
+    ref_docs, ref_queries = ref["_vectors"]
+    ref_top = [_topk(ref_docs @ q, args.k) for q in ref_queries]
+    candidates = [_topk(ref_docs @ q, 50) for q in ref_queries]
+    pairs = [[(q, texts[i]) for i in cand] for q, cand in zip(queries, candidates)]
+
+    results = {}
+    for b in backends:
+        r = raw[b]
+        docs, qs = r.pop("_vectors")
+        res = {k: v for k, v in r.items() if not k.startswith("_")}
+        res["embed.mean_cosine_vs_ref"] = float(np.mean(np.sum(docs * ref_docs, axis=1)))
+        res[f"embed.recall@{args.k}_vs_ref"] = _recall(ref_top, [_topk(docs @ q, args.k) for q in qs])
+        reranker = r.get("_reranker")
+        if reranker is not None:
+            it = iter(range(10 ** 9))
+            res["rerank.query"] = run_case(lambda: reranker.predict(pairs[next(it) % len(pairs)]),
+                                           args.repeat * len(pairs), items=len(pairs[0]))
+            res["_scores"] = [np.asarray(reranker.predict(p)) for p in pairs]
+        results[b] = res
+
+    base = results[backends[0]]
+    ref_scores = base.get("_scores")
+    for b in backends:
+        res = results[b]
+        for case in ("embed.build", "embed.query", "rerank.query"):
+            if case in res:
+                res[case]["speedup_vs_ref"] = base[case]["mean_ms"] / max(res[case]["mean_ms"], 1e-9)
+        if "_scores" in res:
+            scores = res.pop("_scores")
+            got = [c[_topk(s, args.k)] for c, s in zip(candidates, scores)]
+            want = [c[_topk(s, args.k)] for c, s in zip(candidates, ref_scores)]
+            res[f"rerank.recall@{args.k}_vs_ref"] = _recall(want, got)
+            res["rerank.max_abs_score_diff"] = float(max(np.abs(s - t).max() for s, t in zip(scores, ref_scores)))
+
+    print(f"{'backend':<10} {'build chunks/s':>15} {'query ms':>9} {'rerank ms':>10} {'speedup b/q/r':>16} "
+          f"{'cos':>7} {'recall':>7} {'rr recall':>9}")
+    for b in backends:
+        res = results[b]
+        rr = res.get("rerank.query", {})
+        speed = "/".join(f"{res.get(c, {}).get('speedup_vs_ref', 0):.2f}"
+                         for c in ("embed.build", "embed.query", "rerank.query"))
+        print(f"{b:<10} {res['embed.build']['throughput_per_s']:>15.1f} {res['embed.query']['mean_ms']:>9.2f} "
+              f"{rr.get('mean_ms', 0):>10.2f} {speed:>16} {res['embed.mean_cosine_vs_ref']:>7.4f} "
+              f"{res[f'embed.recall@{args.k}_vs_ref']:>7.3f} {res.get(f'rerank.recall@{args.k}_vs_ref', 0):>9.3f}")
+    meta = environment({"embedder": args.embedder, "reranker": args.reranker, "backends": backends,
+                        "threads": args.threads, "pages": args.pages, "chunks": len(texts), "k": args.k})
+    write_report(args.out, meta, results)
+    print(f"wrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
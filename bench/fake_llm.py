@@ -0,0 +1,204 @@
+from __future__ import annotations
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+PAPER_JSON = {
+    "title": "Synthetic Pyramid Networks for Detection",
+    "tasks": ["Object detection", "Instance segmentation"],
+    "methods": [{"name": "FPN", "components": ["Lateral connections", "Top-down pathway"],
+                 "losses": ["Cross-entropy", "Smooth L1"]}],
+    "datasets": [{"name": "COCO", "split": "minival"}, {"name": "VOC07", "split": "test"}],
+    "metrics": [{"dataset": "COCO", "metric": "AP", "value": 36.2, "page": 2},
+                {"dataset": "COCO", "metric": "AP50", "value": 59.1, "page": 2}],
+    "ablations": [{"variable": "Backbone depth", "best_value": "ResNet-101"}],
+}
+ANSWER = (
+    "The method builds a feature pyramid with lateral connections and a top-down pathway [p:1]. "
+    "It is trained with cross-entropy and smooth L1 losses [p:2] and reaches 36.2 AP on COCO [p:2]."
+)
+
+
+class _QuietServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # clients that cancel (hedged losers, early-closed streams) reset their connections
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+
+def _tokenize(text: str, size: int = 4) -> List[str]:
+    """Split a response into small pieces so streaming clients see many chunks."""
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class FakeLLMServer:
+    """
+    Local HTTP server speaking enough of the Ollama (/api/*) and OpenAI
+    (/v1/chat/completions) protocols for the app's LLMClient.
+
+    `delay` is the time to first token, `token_delay` the gap between streamed
+    pieces, `fail_rate` the probability of answering 500. With probability
+    `slow_rate` the first token takes `slow_delay` instead of `delay`, giving
+    a latency tail. Counters record how many requests were served and how many
+    clients hung up mid-stream.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, delay: float = 0.0,
+                 token_delay: float = 0.0, fail_rate: float = 0.0, model: str = "llama3.1",
+                 seed: int = 0, slow_rate: float = 0.0, slow_delay: float = 0.0):
+        self.delay = delay
+        self.token_delay = token_delay
+        self.fail_rate = fail_rate
+        self.slow_rate = slow_rate
+        self.slow_delay = slow_delay
+        self.model = model
+        self.requests = 0
+        self.cancelled = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = _QuietServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def reconfigure(self, seed: int = 0, **settings) -> None:
+        """Change delays/failure rates in place and reset the RNG and counters."""
+        with self._lock:
+            for key, value in settings.items():
+                if not hasattr(self, key) or key.startswith("_"):
+                    raise AttributeError(key)
+                setattr(self, key, value)
+            self._rng = random.Random(seed)
+            self.requests = 0
+            self.cancelled = 0
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            return self._rng.random() < self.fail_rate
+
+    def _first_token_delay(self) -> float:
+        with self._lock:
+            slow = self._rng.random() < self.slow_rate
+        return self.slow_delay if slow else self.delay
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _json(self, code: int, obj) -> None:
+                body = json.dumps(obj).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _body(self) -> dict:
+                n = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(n) or b"{}")
+
+            def _stream(self, content_type: str, lines: List[bytes]) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for line in lines:
+                        self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+                        self.wfile.flush()
+                        if server.token_delay:
+                            time.sleep(server.token_delay)
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    with server._lock:
+                        server.cancelled += 1
+                    self.close_connection = True
+
+            def do_GET(self):
+                if self.path.startswith("/api/tags"):
+                    return self._json(200, {"models": [{"name": server.model}]})
+                self._json(404, {"error": "not found"})
+
+            def do_POST(self):
+                body = self._body()
+                if self.path.startswith("/api/pull"):
+                    return self._json(200, {"status": "success"})
+                if self.path.startswith("/api/generate"):
+                    return self._ollama(body)
+                if self.path.startswith("/v1/chat/completions"):
+                    return self._openai(body)
+                self._json(404, {"error": "not found"})
+
+            def _respond_prelude(self) -> bool:
+                delay = server._first_token_delay()
+                if delay:
+                    time.sleep(delay)
+                if server._should_fail():
+                    self._json(500, {"error": "injected failure"})
+                    return False
+                return True
+
+            def _ollama(self, body: dict) -> None:
+                text = json.dumps(PAPER_JSON) if body.get("format") == "json" else ANSWER
+                if not self._respond_prelude():
+                    return
+                usage = {"prompt_eval_count": len(body.get("prompt", "")) // 4,
+                         "eval_count": len(text) // 4}
+                if not body.get("stream", True):
+                    return self._json(200, {"response": text, "done": True, **usage})
+                pieces = _tokenize(text)
+                lines = [json.dumps({"response": p, "done": False}).encode() + b"\n" for p in pieces]
+                lines.append(json.dumps({"response": "", "done": True, **usage}).encode() + b"\n")
+                self._stream("application/x-ndjson", lines)
+
+            def _openai(self, body: dict) -> None:
+                as_json = (body.get("response_format") or {}).get("type") == "json_object"
+                text = json.dumps(PAPER_JSON) if as_json else ANSWER
+                if not self._respond_prelude():
+                    return
+                prompt = sum(len(m.get("content", "")) for m in body.get("messages", [])) // 4
+                usage = {"prompt_tokens": prompt, "completion_tokens": len(text) // 4}
+                if not body.get("stream"):
+                    return self._json(200, {
+                        "choices": [{"message": {"role": "assistant", "content": text}}],
+                        "usage": usage,
+                    })
+                lines = [
+                    b"data: " + json.dumps({"choices": [{"delta": {"content": p}}]}).encode() + b"\n\n"
+                    for p in _tokenize(text)
+                ]
+                lines.append(b"data: " + json.dumps({"choices": [], "usage": usage}).encode() + b"\n\n")
+                lines.append(b"data: [DONE]\n\n")
+                self._stream("text/event-stream", lines)
+
+        return Handler
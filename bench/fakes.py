@@ -0,0 +1,51 @@
+from __future__ import annotations
+import re
+import zlib
+from typing import Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+class HashEmbedder:
+    """
+    Stand-in for SentenceTransformer: signed feature hashing of word tokens.
+    Deterministic, dependency-free and fast enough that index/search costs
+    dominate, while still ranking lexically similar chunks higher.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(self, sentences: Sequence[str], normalize_embeddings: bool = True,
+               convert_to_numpy: bool = True, batch_size: int = 32, **kwargs) -> np.ndarray:
+        if isinstance(sentences, str):
+            sentences = [sentences]
+        out = np.zeros((len(sentences), self.dim), dtype=np.float32)
+        for i, text in enumerate(sentences):
+            for tok in _tokens(text):
+                h = zlib.crc32(tok.encode("utf-8"))
+                out[i, h % self.dim] += 1.0 if (h >> 31) else -1.0
+        if normalize_embeddings:
+            norms = np.linalg.norm(out, axis=1, keepdims=True)
+            out /= np.maximum(norms, 1e-12)
+        return out
+
+
+class OverlapReranker:
+    """Stand-in for CrossEncoder: Jaccard overlap between query and passage tokens."""
+
+    def predict(self, pairs: Iterable[Tuple[str, str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        scores = []
+        for q, p in pairs:
+            qs, ps = set(_tokens(q)), set(_tokens(p))
+            scores.append(len(qs & ps) / (len(qs | ps) or 1))
+        return np.asarray(scores, dtype=np.float32)
@@ -0,0 +1,108 @@
+from __future__ import annotations
+import json
+import os
+import platform
+import resource
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Linear-interpolated percentile, q in [0, 100]."""
+    if not samples:
+        return 0.0
+    xs = sorted(samples)
+    pos = (len(xs) - 1) * q / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(xs) - 1)
+    return xs[lo] + (xs[hi] - xs[lo]) * (pos - lo)
+
+
+def reset_peak_rss() -> None:
+    """Reset the kernel's RSS high-water mark so the next reading is per case (Linux only)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb() -> float:
+    """Peak RSS of this process in MiB (since the last reset where supported)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+def summarize(samples: List[float], items: int = 1) -> Dict[str, float]:
+    total = sum(samples)
+    return {
+        "n": len(samples),
+        "mean_ms": 1000.0 * total / len(samples) if samples else 0.0,
+        "p50_ms": 1000.0 * percentile(samples, 50),
+        "p99_ms": 1000.0 * percentile(samples, 99),
+        "max_ms": 1000.0 * max(samples) if samples else 0.0,
+        "throughput_per_s": (items * len(samples) / total) if total > 0 else 0.0,
+    }
+
+
+def run_case(fn: Callable[[], object], repeat: int, warmup: int = 1, items: int = 1) -> Dict[str, float]:
+    """
+    Time `fn` `repeat` times after `warmup` untimed calls. `items` is the
+    unit of work per call (pages, chunks, queries) used for throughput.
+    """
+    for _ in range(warmup):
+        fn()
+    reset_peak_rss()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    out = summarize(samples, items=items)
+    out["items_per_call"] = items
+    out["peak_rss_mb"] = peak_rss_mb()
+    return out
+
+
+def environment(extra: Optional[dict] = None) -> dict:
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        **(extra or {}),
+    }
+
+
+def write_report(path: Path, meta: dict, results: Dict[str, dict]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"meta": meta, "results": results}, indent=2, sort_keys=True))
+
+
+def compare(results: Dict[str, dict], baseline_path: Optional[Path] = None) -> str:
+    """Render p50/p99/throughput, with deltas against a previous report if given."""
+    base = json.loads(Path(baseline_path).read_text()).get("results", {}) if baseline_path else {}
+    rows = [f"{'case':<44} {'p50 ms':>16} {'p99 ms':>16} {'thrpt/s':>16}"]
+    for name in sorted(results):
+        cur = results[name]
+        old = base.get(name)
+        cells = []
+        for key in ("p50_ms", "p99_ms", "throughput_per_s"):
+            if old and old.get(key):
+                delta = 100.0 * (cur[key] - old[key]) / old[key]
+                cells.append(f"{cur[key]:>8.2f} ({delta:+5.1f}%)")
+            else:
+                cells.append(f"{cur[key]:>16.2f}")
+        rows.append(f"{name:<44} " + " ".join(f"{c:>16}" for c in cells))
+    return "\n".join(rows)
@@ -0,0 +1,161 @@
+"""
+Static vs hedged LLM routing against two fake backends with injected delays.
+
+    python -m bench.hedging                                   # default scenarios
+    python -m bench.hedging --requests 400 --slow-rate 0.05 --slow-delay 3
+
+Ollama is the primary (USE_LOCAL=1), the OpenAI-protocol fake the secondary.
+Scenarios:
+- tail:   the primary is fast but `--slow-rate` of its requests stall for
+          `--slow-delay` seconds before the first token;
+- outage: the primary answers 500 to everything, so the breaker should open
+          and route straight to the secondary;
+- refused: nothing listens on the primary's port (Ollama down), with the
+          default OLLAMA_RETRY/OLLAMA_BACKOFF. Hedged only: routed calls make
+          one attempt and fail over at once, while a static call would pull
+          the model and retry for minutes per request.
+
+Both modes consume the same streaming path; static always waits on the
+primary, hedged goes through app.core.llm_router.HedgedRouter.
+"""
+from __future__ import annotations
+import argparse
+import os
+import socket
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from bench.harness import environment, percentile, write_report
+
+
+def _configure_env(data_dir: Path, ollama_url: str, openai_url: str) -> None:
+    # must run before app/ is imported: app.deps and app.core.llm read env at import time
+    os.environ["DATA_DIR"] = str(data_dir)
+    os.environ["USE_LOCAL"] = "1"
+    os.environ["OLLAMA_BASE_URL"] = ollama_url
+    os.environ["OPENAI_BASE_URL"] = f"{openai_url}/v1"
+    os.environ["OPENAI_API_KEY"] = "offline-benchmark"
+
+
+def _drive(call, n: int, concurrency: int) -> dict:
+    def one(i: int):
+        t0 = time.perf_counter()
+        try:
+            call(i)
+            return time.perf_counter() - t0, True
+        except Exception:
+            return time.perf_counter() - t0, False
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(one, range(n)))
+    ok = [dt for dt, good in results if good]
+    return {
+        "n": n,
+        "errors": n - len(ok),
+        "p50_ms": 1000.0 * percentile(ok, 50),
+        "p99_ms": 1000.0 * percentile(ok, 99),
+        "max_ms": 1000.0 * max(ok) if ok else 0.0,
+        "mean_ms": 1000.0 * sum(ok) / len(ok) if ok else 0.0,
+    }
+
+
+def _refused_url() -> str:
+    """A loopback URL that refuses connections: a port that was just free."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{s.getsockname()[1]}"
+
+
+def run_scenario(name: str, args, ollama, openai, primary: dict, secondary: dict,
+                 modes=("static", "hedged"), ollama_url: Optional[str] = None) -> dict:
+    from app.core import llm
+    from app.core.llm import LLMClient
+    from app.core.llm_router import HedgedRouter
+
+    base = {"delay": 0.0, "slow_rate": 0.0, "slow_delay": 0.0, "fail_rate": 0.0}
+    client = LLMClient("openai/gpt-4o-mini", "ollama/llama3.1", True, "offline-benchmark")
+    out = {}
+    llm.OLLAMA_BASE_URL = ollama_url or ollama.url
+    for mode in modes:
+        ollama.reconfigure(seed=1, **{**base, **primary})
+        openai.reconfigure(seed=2, **{**base, **secondary})
+        router = HedgedRouter(percentile=args.percentile, hedge_after=args.hedge_after,
+                              min_delay=args.min_delay, min_samples=args.min_samples,
+                              cooldown=args.cooldown)
+
+        def call(i: int) -> None:
+            prompt = f"question {i}"
+            pieces = (router.stream(client, "sys", prompt) if mode == "hedged"
+                      else client.stream_from(client.backend, "sys", prompt))
+            "".join(pieces)
+
+        _drive(call, args.warmup, args.concurrency)
+        sent = (ollama.requests, openai.requests)
+        res = _drive(call, args.requests, args.concurrency)
+        res["primary_requests"] = ollama.requests - sent[0]
+        res["secondary_requests"] = openai.requests - sent[1]
+        res["extra_load"] = (res["primary_requests"] + res["secondary_requests"]) / args.requests - 1.0
+        time.sleep(args.slow_delay + 0.2)  # let cancelled losers answer and hang up before reading counters
+        res["cancelled"] = ollama.cancelled + openai.cancelled
+        if mode == "hedged":
+            report = router.report()
+            res["decisions"] = report["decisions"]
+            res["hedges"] = report["hedges"]
+            res["breaker"] = {b: s["breaker"] for b, s in report["backends"].items()}
+        out[f"{name}.{mode}"] = res
+    llm.OLLAMA_BASE_URL = ollama.url
+    return out
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--warmup", type=int, default=30, help="untimed requests that seed the TTFT window")
+    ap.add_argument("--concurrency", type=int, default=4)
+    ap.add_argument("--primary-delay", type=float, default=0.05)
+    ap.add_argument("--secondary-delay", type=float, default=0.15)
+    ap.add_argument("--slow-rate", type=float, default=0.1)
+    ap.add_argument("--slow-delay", type=float, default=1.5)
+    ap.add_argument("--percentile", type=float, default=90.0)
+    ap.add_argument("--hedge-after", type=float, default=0.5)
+    ap.add_argument("--min-delay", type=float, default=0.05)
+    ap.add_argument("--min-samples", type=int, default=20)
+    ap.add_argument("--cooldown", type=float, default=5.0)
+    ap.add_argument("--scenarios", default="tail,outage,refused")
+    ap.add_argument("--out", type=Path, default=Path("bench/results/hedging.json"))
+    args = ap.parse_args(argv)
+
+    from bench.fake_llm import FakeLLMServer
+
+    scenarios = {s.strip() for s in args.scenarios.split(",") if s.strip()}
+    secondary = {"delay": args.secondary_delay}
+    results = {}
+    with FakeLLMServer() as ollama, FakeLLMServer() as openai:
+        _configure_env(Path(tempfile.mkdtemp(prefix="cvrc-hedging-")) / "data", ollama.url, openai.url)
+        if "tail" in scenarios:
+            results.update(run_scenario("tail", args, ollama, openai, {
+                "delay": args.primary_delay, "slow_rate": args.slow_rate, "slow_delay": args.slow_delay,
+            }, secondary))
+        if "outage" in scenarios:
+            results.update(run_scenario("outage", args, ollama, openai,
+                                        {"delay": args.primary_delay, "fail_rate": 1.0}, secondary))
+        if "refused" in scenarios:
+            results.update(run_scenario("refused", args, ollama, openai, {}, secondary,
+                                        modes=("hedged",), ollama_url=_refused_url()))
+
+    print(f"{'case':<16} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9} {'errors':>7} {'extra load':>11}  decisions")
+    for name, r in results.items():
+        print(f"{name:<16} {r['p50_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['max_ms']:>9.1f} {r['errors']:>7} "
+              f"{100 * r['extra_load']:>10.1f}%  {r.get('decisions', '')}")
+    meta = environment({k: v for k, v in vars(args).items() if k != "out"})
+    write_report(args.out, meta, results)
+    print(f"wrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""
+Run the offline benchmark suite and write a JSON report.
+
+    python -m bench.run                                   # fake models, sizes 4,16,48 pages
+    python -m bench.run --sizes 8 --repeat 20 --suites retrieval,e2e
+    python -m bench.run --embedder BAAI/bge-m3 --reranker cross-encoder/ms-marco-MiniLM-L-6-v2
+    python -m bench.run --compare bench/results/baseline.json
+
+`--embedder/--reranker fake` use bench.fakes; any other value is loaded the
+normal way and must already be in the local Hugging Face cache.
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import itertools
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from bench.harness import compare, environment, run_case, write_report
+
+
+def _configure_env(data_dir: Path, llm_url: str, llm: str, embedder: str, reranker: str) -> None:
+    # must run before anything under app/ is imported: app.deps reads env at import time
+    os.environ["DATA_DIR"] = str(data_dir)
+    os.environ["EMBED_MODEL"] = embedder
+    os.environ["RERANK_MODEL"] = "" if reranker == "none" else reranker
+    os.environ["USE_LOCAL"] = "1" if llm == "ollama" else "0"
+    os.environ["OLLAMA_BASE_URL"] = llm_url
+    os.environ["OPENAI_BASE_URL"] = f"{llm_url}/v1"
+    os.environ["OPENAI_API_KEY"] = "offline-benchmark"
+    os.environ["OLLAMA_RETRY"] = "1"
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+    os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+
+def _install_fakes(embedder: str, reranker: str) -> None:
+    from bench.fakes import HashEmbedder, OverlapReranker
+    from app.core.embed import register_encoder
+    from app.core.retrieve import register_reranker
+
+    if embedder == "fake":
+        register_encoder("fake", HashEmbedder())
+    if reranker == "fake":
+        register_reranker("fake", OverlapReranker())
+
+
+def bench_ingest(pdfs, results: dict, repeat: int) -> None:
+    import fitz
+    from app.deps import STORE_DIR, INDEX_DIR, EMBED_MODEL
+    from app.core.parsing import parse_pdf_to_blocks
+    from app.core.chunking import chunk_blocks
+    from app.core.embed import IndexStore
+
+    store = IndexStore(EMBED_MODEL, INDEX_DIR)
+    for pdf in pdfs:
+        with fitz.open(str(pdf)) as doc:
+            pages = len(doc)
+        doc_id = pdf.stem
+        blocks_path = STORE_DIR / f"{doc_id}.blocks.jsonl"
+        chunks_path = STORE_DIR / f"{doc_id}.chunks.jsonl"
+
+        results[f"ingest.parse[pages={pages}]"] = run_case(
+            lambda: parse_pdf_to_blocks(pdf, doc_id, blocks_path), repeat, items=pages)
+        blocks = [b.__dict__ for b in parse_pdf_to_blocks(pdf, doc_id, blocks_path)]
+
+        results[f"ingest.chunk[pages={pages}]"] = run_case(
+            lambda: chunk_blocks(blocks, doc_id, chunks_path), repeat, items=len(blocks))
+        chunks = [c.__dict__ for c in chunk_blocks(blocks, doc_id, chunks_path)]
+
+        results[f"ingest.build[pages={pages}]"] = run_case(
+            lambda: store.build(doc_id, chunks), repeat, items=len(chunks))
+
+
+def bench_retrieval(pdfs, results: dict, repeat: int) -> None:
+    import fitz
+    from app.deps import INDEX_DIR, EMBED_MODEL, RERANK_MODEL, TOP_K
+    from app.core.embed import IndexStore
+    from app.core.retrieve import Retriever
+    from bench.synth import QUERIES
+
+    store = IndexStore(EMBED_MODEL, INDEX_DIR)
+    retriever = Retriever(store, RERANK_MODEL)
+    n = repeat * len(QUERIES)
+    for pdf in pdfs:
+        with fitz.open(str(pdf)) as doc:
+            pages = len(doc)
+        doc_id = pdf.stem
+        queries = itertools.cycle(QUERIES)
+        results[f"retrieval.search[pages={pages}]"] = run_case(
+            lambda: store.search(doc_id, next(queries), top_k=50), n)
+        results[f"retrieval.retrieve[pages={pages}]"] = run_case(
+            lambda: retriever.retrieve(doc_id, next(queries), k=TOP_K), n)
+
+
+def bench_e2e(pdf, results: dict, repeat: int) -> None:
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from bench.synth import QUERIES, revise_pdf
+
+    client = TestClient(app)
+    payload = pdf.read_bytes()
+
+    def ingest():
+        r = client.post("/ingest/", files={"file": (pdf.name, payload, "application/pdf")})
+        r.raise_for_status()
+        return r.json()
+
+    def ingest_fresh():
+        # identical content short-circuits once indexed, so drop it first (DELETE is ~free)
+        client.delete(f"/documents/{hashlib.md5(payload).hexdigest()}")
+        return ingest()
+
+    results["e2e.ingest"] = run_case(ingest_fresh, repeat, warmup=0)
+    doc_id = ingest()["doc_id"]
+    results["e2e.ingest_cached"] = run_case(ingest, repeat)
+
+    # revised copies of the indexed paper: detected as near-duplicates, only the diff is embedded.
+    # "revision" appends a page; "revision_insert" adds one after the first page, shifting all later text
+    for case, at in (("e2e.ingest_revision", -1), ("e2e.ingest_revision_insert", 1)):
+        name = f"{pdf.stem}-{case.split('.', 1)[1]}.pdf"
+        revised = revise_pdf(pdf, pdf.with_name(name), at=at).read_bytes()
+
+        def ingest_revision(name=name, revised=revised):
+            client.delete(f"/documents/{hashlib.md5(revised).hexdigest()}")
+            r = client.post("/ingest/", files={"file": (name, revised, "application/pdf")})
+            r.raise_for_status()
+            return r.json()
+
+        results[case] = run_case(ingest_revision, repeat, warmup=0)
+        rev = ingest_revision()
+        results[case].update(reused_chunks=rev["reused_chunks"], embedded_chunks=rev["embedded_chunks"])
+
+    queries = itertools.cycle(QUERIES)
+
+    def ask():
+        r = client.post("/ask/", json={"doc_id": doc_id, "question": next(queries)})
+        r.raise_for_status()
+
+    def extract():
+        r = client.post("/extract/", json={"doc_id": doc_id})
+        r.raise_for_status()
+
+    results["e2e.ask"] = run_case(ask, repeat * len(QUERIES))
+    results["e2e.extract"] = run_case(extract, repeat)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", default="4,16,48", help="comma-separated page counts")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--suites", default="ingest,retrieval,e2e")
+    ap.add_argument("--embedder", default="fake", help="'fake' or a sentence-transformers model name")
+    ap.add_argument("--reranker", default="fake", help="'fake', 'none' or a cross-encoder model name")
+    ap.add_argument("--llm", choices=["ollama", "openai"], default="ollama", help="wire protocol of the fake LLM")
+    ap.add_argument("--llm-delay", type=float, default=0.0, help="fake LLM time to first token (s)")
+    ap.add_argument("--workdir", type=Path, default=None, help="defaults to a fresh temp dir")
+    ap.add_argument("--out", type=Path, default=Path("bench/results/latest.json"))
+    ap.add_argument("--compare", type=Path, default=None, help="previous report to diff against")
+    args = ap.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    suites = {s.strip() for s in args.suites.split(",") if s.strip()}
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix="cvrc-bench-"))
+
+    from bench.fake_llm import FakeLLMServer
+
+    with FakeLLMServer(delay=args.llm_delay) as llm:
+        _configure_env(workdir / "data", llm.url, args.llm, args.embedder, args.reranker)
+        _install_fakes(args.embedder, args.reranker)
+
+        from bench.synth import make_corpus
+        pdfs = make_corpus(workdir / "corpus", sizes)
+
+        results: dict = {}
+        if "ingest" in suites or "retrieval" in suites:
+            bench_ingest(pdfs, results, args.repeat)
+        if "retrieval" in suites:
+            bench_retrieval(pdfs, results, args.repeat)
+        if "e2e" in suites:
+            bench_e2e(pdfs[len(pdfs) // 2], results, args.repeat)
+        if "ingest" not in suites:
+            results = {k: v for k, v in results.items() if not k.startswith("ingest.")}
+
+    meta = environment({
+        "sizes": sizes, "repeat": args.repeat, "suites": sorted(suites),
+        "embedder": args.embedder, "reranker": args.reranker, "llm": args.llm,
+        "llm_delay": args.llm_delay,
+    })
+    write_report(args.out, meta, results)
+    print(f"wrote {args.out}")
+    print(compare(results, args.compare))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+from __future__ import annotations
+import random
+from pathlib import Path
+from typing import List
+
+import fitz  # PyMuPDF
+
+SECTIONS = [
+    "Introduction", "Related Work", "Method", "Feature Pyramid", "Loss Functions",
+    "Experiments", "Datasets", "Implementation Details", "Ablation Study", "Conclusion",
+]
+VOCAB = (
+    "backbone feature pyramid anchor proposal region detector segmentation mask "
+    "transformer attention convolution resnet stride lateral top-down pathway "
+    "bounding box regression classification loss focal cross-entropy smooth "
+    "training inference augmentation batch learning rate schedule imagenet coco "
+    "pascal voc cityscapes ade20k map miou ap50 ap75 recall precision baseline "
+    "ablation improvement scale resolution multi-scale head neck decoder encoder"
+).split()
+DATASETS = ["COCO", "VOC07", "Cityscapes", "ADE20K", "LVIS"]
+METRICS = ["AP", "AP50", "AP75", "mIoU", "AR@100"]
+
+PAGE_W, PAGE_H = 612, 792
+MARGIN = 54
+
+
+def _sentence(rng: random.Random) -> str:
+    words = rng.choices(VOCAB, k=rng.randint(10, 22))
+    if rng.random() < 0.3:
+        words += ["on", rng.choice(DATASETS)]
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraph(rng: random.Random) -> str:
+    return " ".join(_sentence(rng) for _ in range(rng.randint(3, 6)))
+
+
+def _draw_table(page, top: float, rng: random.Random) -> float:
+    """Draw a ruled results table (pdfplumber's default strategy detects the lines)."""
+    cols = ["Method"] + rng.sample(METRICS, 3)
+    rows = [cols] + [
+        [f"{rng.choice(['FPN', 'RPN', 'Mask', 'Ours'])}-{i}"] + [f"{rng.uniform(20, 80):.1f}" for _ in cols[1:]]
+        for i in range(rng.randint(3, 5))
+    ]
+    col_w = (PAGE_W - 2 * MARGIN) / len(cols)
+    row_h = 16
+    for r, row in enumerate(rows):
+        for c, cell in enumerate(row):
+            x0 = MARGIN + c * col_w
+            y0 = top + r * row_h
+            page.draw_rect(fitz.Rect(x0, y0, x0 + col_w, y0 + row_h), width=0.5)
+            page.insert_text((x0 + 3, y0 + 11), cell, fontsize=8)
+    return top + len(rows) * row_h + 12
+
+
+def make_paper_pdf(path: Path, pages: int, seed: int = 0) -> Path:
+    """Write a deterministic CV-paper-like PDF with headings, paragraphs and tables."""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    section = 0
+    for p in range(pages):
+        page = doc.new_page(width=PAGE_W, height=PAGE_H)
+        y = MARGIN
+        if p == 0:
+            page.insert_text((MARGIN, y + 14), "SYNTHETIC PYRAMID NETWORKS FOR DETECTION", fontsize=14)
+            y += 30
+        while y < PAGE_H - 160:
+            if rng.random() < 0.35:
+                section += 1
+                title = f"{section}. {SECTIONS[section % len(SECTIONS)]}"
+                page.insert_text((MARGIN, y + 12), title, fontsize=11)
+                y += 22
+            if rng.random() < 0.25:
+                y = _draw_table(page, y, rng)
+                continue
+            rect = fitz.Rect(MARGIN, y, PAGE_W - MARGIN, y + 90)
+            page.insert_textbox(rect, _paragraph(rng), fontsize=9)
+            y += 96
+    path.parent.mkdir(parents=True, exist_ok=True)
+    doc.save(str(path))
+    doc.close()
+    return path
+
+
+def revise_pdf(src: Path, dst: Path, seed: int = 1, at: int = -1) -> Path:
+    """
+    Write `src` plus one page with a new section: a v2 / camera-ready stand-in
+    with mostly unchanged text. `at` is the new page's index (-1 appends it).
+    """
+    rng = random.Random(seed)
+    doc = fitz.open(str(src))
+    page = doc.new_page(pno=at, width=PAGE_W, height=PAGE_H)
+    page.insert_text((MARGIN, MARGIN + 12), "A. Additional Results", fontsize=11)
+    page.insert_textbox(fitz.Rect(MARGIN, MARGIN + 22, PAGE_W - MARGIN, MARGIN + 112), _paragraph(rng), fontsize=9)
+    doc.set_metadata({**doc.metadata, "title": "camera-ready"})
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    doc.save(str(dst))
+    doc.close()
+    return dst
+
+
+def make_corpus(out_dir: Path, sizes: List[int], seed: int = 0) -> List[Path]:
+    return [make_paper_pdf(out_dir / f"synthetic-{n}p.pdf", n, seed=seed + n) for n in sizes]
+
+
+QUERIES = [
+    "What is the main method and its loss functions?",
+    "Which datasets are used for evaluation?",
+    "What AP does the model reach on COCO?",
+    "How does the feature pyramid use lateral connections?",
+    "What does the ablation study show about multi-scale training?",
+    "What backbone and learning rate schedule are used?",
+]
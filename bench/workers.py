@@ -0,0 +1,250 @@
+"""
+Measure RSS per uvicorn worker and /ask throughput scaling from 1 to N workers.
+
+    python -m bench.workers --workers 1,2,4                # shared inference process + mmap
+    python -m bench.workers --workers 1,2,4 --no-shared --embedder BAAI/bge-m3 \\
+        --reranker cross-encoder/ms-marco-MiniLM-L-6-v2     # every worker loads its own models
+
+In shared mode a single inference process (this script, with fake models by
+default) serves encode/rerank for all workers over INFERENCE_SOCKET. RSS is
+read from /proc, so per-worker numbers are Linux only; PSS splits pages shared
+through the OS cache (mmap'd indexes, the Python runtime) evenly across the
+processes mapping them.
+"""
+from __future__ import annotations
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import requests
+
+from bench.harness import environment, percentile, write_report
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _children(pid: int) -> List[int]:
+    kids = []
+    for entry in Path("/proc").iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+        except OSError:
+            continue
+        # the ppid is the 2nd field after the parenthesised command name
+        if int(stat.rsplit(")", 1)[1].split()[1]) == pid:
+            kids.append(int(entry.name))
+    return kids
+
+
+def _memory_mb(pid: int) -> Dict[str, float]:
+    out: Dict[str, float] = {}
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            key, _, rest = line.partition(":")
+            if key in ("VmRSS", "RssAnon", "RssFile", "RssShmem"):
+                out[key] = int(rest.split()[0]) / 1024.0
+        for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines():
+            if line.startswith("Pss:"):
+                out["Pss"] = int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return out
+
+
+def _wait_ready(url: str, timeout: float = 120.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=1).ok:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"server at {url} did not come up")
+
+
+def _serve_inference(args) -> None:
+    """Internal mode: run the shared inference process with the requested (fake) models."""
+    from bench.run import _install_fakes
+    from app.core.inference import InferenceServer
+
+    _install_fakes(args.embedder, args.reranker)
+    try:
+        InferenceServer(os.environ["INFERENCE_SOCKET"]).serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def _load(base: str, doc_id: str, clients: int, duration: float) -> Dict[str, float]:
+    from bench.synth import QUERIES
+
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    stop = time.time() + duration
+
+    def client(i: int) -> None:
+        session = requests.Session()
+        n = i
+        while time.time() < stop:
+            t0 = time.perf_counter()
+            try:
+                r = session.post(f"{base}/ask/", json={"doc_id": doc_id, "question": QUERIES[n % len(QUERIES)]},
+                                 timeout=60)
+                ok = r.ok
+            except requests.RequestException:
+                ok = False
+            dt = time.perf_counter() - t0
+            with lock:
+                if ok:
+                    latencies.append(dt)
+                else:
+                    errors[0] += 1
+            n += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "throughput_per_s": len(latencies) / elapsed,
+        "p50_ms": 1000.0 * percentile(latencies, 50),
+        "p99_ms": 1000.0 * percentile(latencies, 99),
+    }
+
+
+def run_level(n_workers: int, args, workdir: Path, llm_url: str, pdf: Path) -> dict:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = dict(os.environ)
+    env.update({
+        "DATA_DIR": str(workdir / "data"),
+        "EMBED_MODEL": args.embedder,
+        "RERANK_MODEL": "" if args.reranker == "none" else args.reranker,
+        "USE_LOCAL": "1",
+        "OLLAMA_BASE_URL": llm_url,
+        "OLLAMA_RETRY": "1",
+        "INDEX_MMAP": "1",
+        "HF_HUB_OFFLINE": env.get("HF_HUB_OFFLINE", "1"),
+    })
+    procs = []
+    if args.shared:
+        env["INFERENCE_SOCKET"] = str(workdir / "inference.sock")
+        procs.append(subprocess.Popen(
+            [sys.executable, "-m", "bench.workers", "--serve-inference",
+             "--embedder", args.embedder, "--reranker", args.reranker], env=env))
+        deadline = time.time() + 60
+        while not Path(env["INFERENCE_SOCKET"]).exists() and time.time() < deadline:
+            time.sleep(0.1)
+    else:
+        env.pop("INFERENCE_SOCKET", None)
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(n_workers), "--log-level", "warning"], env=env)
+    procs.append(server)
+    try:
+        _wait_ready(f"{base}/")
+        with pdf.open("rb") as f:
+            r = requests.post(f"{base}/ingest/", files={"file": (pdf.name, f, "application/pdf")}, timeout=600)
+        r.raise_for_status()
+        doc_id = r.json()["doc_id"]
+
+        # warm every worker (model load / first mmap) before measuring
+        _load(base, doc_id, clients=2 * n_workers, duration=min(2.0, args.duration))
+        load = _load(base, doc_id, clients=args.clients_per_worker * n_workers, duration=args.duration)
+
+        # with --workers 1 uvicorn serves from the main process instead of forking
+        pids = _children(server.pid) if n_workers > 1 else [server.pid]
+        workers = [_memory_mb(pid) for pid in pids]
+        inference = _memory_mb(procs[0].pid) if args.shared else {}
+        rss = [w.get("VmRSS", 0.0) for w in workers]
+        pss = [w.get("Pss", 0.0) for w in workers]
+        return {
+            "workers": n_workers,
+            **load,
+            "worker_rss_mb": rss,
+            "worker_rss_mean_mb": sum(rss) / len(rss) if rss else 0.0,
+            "worker_pss_mean_mb": sum(pss) / len(pss) if pss else 0.0,
+            "worker_anon_mean_mb": sum(w.get("RssAnon", 0.0) for w in workers) / len(workers) if workers else 0.0,
+            "inference_rss_mb": inference.get("VmRSS", 0.0),
+            "total_pss_mb": sum(pss) + inference.get("Pss", 0.0),
+        }
+    finally:
+        for p in reversed(procs):
+            p.send_signal(signal.SIGINT)
+        for p in reversed(procs):
+            try:
+                p.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    ap.add_argument("--duration", type=float, default=10.0, help="seconds of load per level")
+    ap.add_argument("--clients-per-worker", type=int, default=4)
+    ap.add_argument("--pages", type=int, default=16)
+    ap.add_argument("--embedder", default="fake")
+    ap.add_argument("--reranker", default="fake")
+    ap.add_argument("--no-shared", dest="shared", action="store_false",
+                    help="let every worker load its own models (needs real model names)")
+    ap.add_argument("--llm-delay", type=float, default=0.0)
+    ap.add_argument("--out", type=Path, default=Path("bench/results/workers.json"))
+    ap.add_argument("--serve-inference", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.serve_inference:
+        _serve_inference(args)
+        return 0
+    if not args.shared and "fake" in (args.embedder, args.reranker):
+        ap.error("--no-shared loads models inside each worker; pass real --embedder/--reranker names")
+
+    from bench.fake_llm import FakeLLMServer
+    from bench.synth import make_paper_pdf
+
+    levels = [int(n) for n in args.workers.split(",") if n.strip()]
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="cvrc-workers-") as tmp, FakeLLMServer(delay=args.llm_delay) as llm:
+        workdir = Path(tmp)
+        pdf = make_paper_pdf(workdir / "paper.pdf", args.pages)
+        for n in levels:
+            res = run_level(n, args, workdir, llm.url, pdf)
+            results[f"workers={n}"] = res
+            print(f"workers={n:<3} {res['throughput_per_s']:8.1f} req/s  p50 {res['p50_ms']:7.1f} ms  "
+                  f"p99 {res['p99_ms']:7.1f} ms  rss/worker {res['worker_rss_mean_mb']:7.1f} MiB  "
+                  f"pss/worker {res['worker_pss_mean_mb']:7.1f} MiB  errors {res['errors']}", flush=True)
+
+    base = results.get(f"workers={levels[0]}", {}).get("throughput_per_s") or 0.0
+    for n in levels:
+        res = results[f"workers={n}"]
+        res["scaling_vs_first"] = res["throughput_per_s"] / base if base else 0.0
+    meta = environment({"levels": levels, "shared": args.shared, "embedder": args.embedder,
+                        "reranker": args.reranker, "duration": args.duration, "pages": args.pages})
+    write_report(args.out, meta, results)
+    print(f"wrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# app.deps creates its data directories on import; keep them out of the checkout
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="copilot-tests-"))
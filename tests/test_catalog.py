@@ -0,0 +1,61 @@
+import sqlite3
+import time
+
+import pytest
+
+from app.core.catalog import Catalog, artifact_paths, PARSING
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    return Catalog(tmp_path / "catalog.sqlite3")
+
+
+def _write(doc_id, kinds=("pdf", "blocks")):
+    paths = artifact_paths(doc_id)
+    for kind in kinds:
+        paths[kind].write_bytes(b"x")
+    return paths
+
+
+def test_gc_removes_untracked_partial_sets(catalog):
+    paths = _write("orphan")
+    report = catalog.gc()
+    assert report["orphans_removed"] == ["orphan"]
+    assert not paths["pdf"].exists() and not paths["blocks"].exists()
+
+
+def test_gc_spares_an_ingest_claimed_after_its_snapshot(catalog, monkeypatch):
+    paths = _write("racing")
+    real_list = catalog.list
+
+    def stale_list(*args, **kwargs):
+        # the snapshot is taken, then an ingest claims the doc before gc gets to it
+        rows = real_list(*args, **kwargs)
+        assert catalog.begin("racing", "racing.pdf") is None
+        return rows
+
+    monkeypatch.setattr(catalog, "list", stale_list)
+    report = catalog.gc()
+    assert report["orphans_removed"] == []
+    assert paths["pdf"].exists()
+    assert catalog.get("racing")["status"] == PARSING
+
+
+def test_gc_spares_a_stale_ingest_restarted_after_its_snapshot(catalog, monkeypatch):
+    assert catalog.begin("stale", "stale.pdf") is None
+    with sqlite3.connect(str(catalog.path)) as conn:  # an ingest that died two hours ago
+        conn.execute("UPDATE documents SET updated_at = ? WHERE doc_id = 'stale'", (time.time() - 7200,))
+    paths = _write("stale")
+    real_list = catalog.list
+
+    def stale_list(*args, **kwargs):
+        rows = real_list(*args, **kwargs)
+        assert catalog.begin("stale", "stale.pdf") is None  # reclaimed: it was stale
+        return rows
+
+    monkeypatch.setattr(catalog, "list", stale_list)
+    report = catalog.gc()
+    assert report["purged"] == []
+    assert paths["pdf"].exists()
+    assert catalog.get("stale") is not None
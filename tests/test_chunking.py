@@ -0,0 +1,43 @@
+from app.core.chunking import chunk_blocks
+
+
+def _blocks(lines, prefix="b"):
+    return [{"kind": "paragraph", "text": t, "page": 1 + i // 20, "id": f"{prefix}{i}"} for i, t in enumerate(lines)]
+
+
+def _lines(n, tag="line"):
+    return [f"{tag} {i} " + "feature pyramid " * 6 for i in range(n)]
+
+
+def test_anchors_match_plain_chunking_when_nothing_changed(tmp_path):
+    blocks = _blocks(_lines(200))
+    plain = chunk_blocks(blocks, "a", tmp_path / "a.jsonl")
+    anchored = chunk_blocks(blocks, "b", tmp_path / "b.jsonl", anchors=[c.text for c in plain])
+    assert [c.text for c in anchored] == [c.text for c in plain]
+    assert [c.block_ids for c in anchored] == [c.block_ids for c in plain]
+
+
+def test_boundaries_resync_after_an_early_insertion(tmp_path):
+    lines = _lines(200)
+    parent = [c.text for c in chunk_blocks(_blocks(lines), "a", tmp_path / "a.jsonl")]
+    revised = _blocks(lines[:15] + _lines(3, "inserted") + lines[15:], "n")
+
+    greedy = chunk_blocks(revised, "b", tmp_path / "b.jsonl")
+    anchored = chunk_blocks(revised, "b", tmp_path / "b.jsonl", anchors=parent)
+
+    # without anchors every boundary after the insertion shifts
+    assert sum(c.text in parent for c in greedy) <= 1
+    # with them only the chunk around the insertion is new
+    assert sum(c.text not in parent for c in anchored) <= 2
+    assert "\n".join(c.text for c in anchored) == "\n".join(b["text"].strip() for b in revised)
+
+
+def test_tables_stay_separate_chunks(tmp_path):
+    lines = _lines(40)
+    blocks = _blocks(lines[:10]) + [{"kind": "table", "text": "Method | AP\nOurs | 40.1", "page": 1, "id": "t"}] \
+        + _blocks(lines[10:], "c")
+    parent = [c.text for c in chunk_blocks(blocks, "a", tmp_path / "a.jsonl")]
+    revised = _blocks(_lines(2, "new")) + blocks
+    chunks = chunk_blocks(revised, "b", tmp_path / "b.jsonl", anchors=parent)
+    table = [c for c in chunks if c.block_ids == ["t"]]
+    assert len(table) == 1 and table[0].text == "Method | AP\nOurs | 40.1"
@@ -0,0 +1,28 @@
+import threading
+import time
+
+import pytest
+
+from app.core.inference import InferenceServer, main
+
+
+def test_wait_outlasts_a_server_that_starts_late(tmp_path):
+    sock = str(tmp_path / "inference.sock")
+    server = InferenceServer(sock, authkey="")
+
+    def start_late():
+        time.sleep(0.5)  # e.g. preloading models before it listens
+        server.serve_forever()
+
+    threading.Thread(target=start_late, daemon=True).start()
+    try:
+        main(["--socket", sock, "--wait", "10"])
+    finally:
+        server.close()
+
+
+def test_wait_gives_up_after_its_timeout(tmp_path):
+    start = time.monotonic()
+    with pytest.raises(FileNotFoundError):
+        main(["--socket", str(tmp_path / "missing.sock"), "--wait", "0.3"])
+    assert time.monotonic() - start < 5
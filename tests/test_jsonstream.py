@@ -0,0 +1,88 @@
+import pytest
+
+from app.core.jsonstream import StreamingJSONParser
+
+
+def _feed(parser, text, size=3):
+    for i in range(0, len(text), size):
+        parser.feed(text[i:i + size])
+        if parser.done:
+            break
+    return parser
+
+
+def test_complete_object_sets_done_and_fields():
+    p = _feed(StreamingJSONParser(), 'Sure! ```json\n{"title": "FPN", "tasks": ["det"]}\n``` trailing')
+    assert p.done
+    assert p.result() == {"title": "FPN", "tasks": ["det"]}
+    assert p.fields == {"title": "FPN", "tasks": ["det"]}
+
+
+@pytest.mark.parametrize("size", [1, 5, 1000])
+def test_invalid_balanced_candidate_is_skipped(size):
+    text = 'Using the schema {title, tasks} here is: {"title": "FPN", "tasks": ["det", "seg"]} done'
+    p = _feed(StreamingJSONParser(), text, size)
+    assert p.done
+    assert p.result() == {"title": "FPN", "tasks": ["det", "seg"]}
+    assert p.fields == {"title": "FPN", "tasks": ["det", "seg"]}
+
+
+def test_braces_inside_strings_do_not_close():
+    p = _feed(StreamingJSONParser(), '{"title": "a } b {", "tasks": []}')
+    assert p.done
+    assert p.result()["title"] == "a } b {"
+
+
+def test_repair_closes_open_string_and_containers():
+    p = _feed(StreamingJSONParser(), '{"title": "FPN", "tasks": ["det", "se')
+    assert not p.done
+    assert p.result() == {"title": "FPN", "tasks": ["det", "se"]}
+
+
+def test_repair_drops_dangling_comma():
+    p = _feed(StreamingJSONParser(), '{"title": "FPN", "tasks": ["det",')
+    assert p.result() == {"title": "FPN", "tasks": ["det"]}
+
+
+def test_repair_backs_off_to_last_clean_cut():
+    # a half-written key cannot be closed in place; cut back to the last comma
+    p = _feed(StreamingJSONParser(), '{"title": "FPN", "metrics": [{"dataset": "COCO", "val')
+    assert p.result() == {"title": "FPN", "metrics": [{"dataset": "COCO"}]}
+
+
+def test_falls_back_to_completed_fields():
+    # the unquoted key poisons every cut point, so only the completed field survives
+    p = _feed(StreamingJSONParser(), '{title: "FPN", "tasks": ["det"], "x": tru')
+    assert p.result() == {"tasks": ["det"]}
+
+
+def test_unrecoverable_object_raises():
+    p = _feed(StreamingJSONParser(), "I could not find {the requested fields")
+    assert p.started
+    with pytest.raises(ValueError):
+        p.result()
+
+
+def test_unrecoverable_output_is_a_502():
+    from fastapi import HTTPException
+    from app.routes.extract import parse_model_output
+
+    text = "I could not find {the requested fields"
+    p = _feed(StreamingJSONParser(), text)
+    with pytest.raises(HTTPException) as e:
+        parse_model_output(p, text)
+    assert e.value.status_code == 502
+
+
+def test_many_dropped_candidates_in_one_piece():
+    p = StreamingJSONParser()
+    p.feed("{a} " * 1500 + '{"title": "FPN"}')
+    assert p.done
+    assert p.result() == {"title": "FPN"}
+
+
+def test_no_object_raises():
+    p = _feed(StreamingJSONParser(), "I cannot answer that.")
+    assert not p.started
+    with pytest.raises(ValueError):
+        p.result()
@@ -0,0 +1,48 @@
+import asyncio
+import hashlib
+
+import pytest
+
+from app.core.uploads import UploadSessions, UploadError
+
+
+async def _body(*blocks):
+    for block in blocks:
+        yield block
+
+
+def _append(sessions, upload_id, offset, *blocks):
+    return asyncio.run(sessions.append(upload_id, offset, _body(*blocks)))
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    return UploadSessions(tmp_path)
+
+
+def test_chunks_resume_from_the_server_offset(sessions):
+    upload_id = sessions.create("a.pdf", 6)["upload_id"]
+    assert _append(sessions, upload_id, 0, b"abc")["offset"] == 3
+    with pytest.raises(UploadError) as e:
+        _append(sessions, upload_id, 0, b"abc")
+    assert e.value.current == 3
+    assert _append(sessions, upload_id, 3, b"def")["offset"] == 6
+
+
+def test_complete_seals_the_bytes_it_hashes(sessions):
+    upload_id = sessions.create("a.pdf")["upload_id"]  # no declared size
+    _append(sessions, upload_id, 0, b"abcdef")
+    doc_id, path, rec = sessions.complete(upload_id)
+    assert doc_id == hashlib.md5(b"abcdef").hexdigest() and rec["offset"] == 6
+
+    # a late PUT at the final offset must not grow the file being ingested
+    with pytest.raises(UploadError):
+        _append(sessions, upload_id, 6, b"ghi")
+    assert path.read_bytes() == b"abcdef"
+    with pytest.raises(UploadError):
+        sessions.complete(upload_id)
+
+    assert sessions.gc(stale_after=3600) == []  # still being ingested
+    assert path.exists()
+    assert sessions.discard(upload_id)
+    assert not path.exists()
@@ -1,5 +1,5 @@
 import streamlit as st
-import requests, json
+import requests, json, time
 
 # BACKEND = st.secrets.get("backend", "http://localhost:8000")
 BACKEND = "http://localhost:8000"
@@ -16,15 +16,69 @@ if "doc_id" not in st.session_state:
 
 st.header("1) Upload PDF & Ingest")
 uploaded = st.file_uploader("Select a CV paper PDF", type=["pdf"])
+
+
+def upload_resumable(uploaded, retries: int = 5):
+    """Send the file in chunks via /ingest/uploads, resuming from the server offset after errors."""
+    key = (uploaded.name, uploaded.size)
+    sessions = st.session_state.setdefault("uploads", {})
+    upload_id = sessions.get(key)
+    r = requests.get(f"{BACKEND}/ingest/uploads/{upload_id}", timeout=30) if upload_id else None
+    if r is None or not r.ok:
+        r = requests.post(f"{BACKEND}/ingest/uploads", json={"filename": uploaded.name, "size": uploaded.size}, timeout=30)
+        r.raise_for_status()
+    info = r.json()
+    sessions[key] = upload_id = info["upload_id"]
+    offset, step = info["offset"], info["chunk_bytes"]
+
+    progress = st.progress(0.0, text="Uploading")
+    failures = 0
+    while offset < uploaded.size:
+        uploaded.seek(offset)
+        chunk = uploaded.read(step)
+        try:
+            r = requests.put(f"{BACKEND}/ingest/uploads/{upload_id}", params={"offset": offset}, data=chunk, timeout=120)
+            if r.status_code != 409:
+                r.raise_for_status()
+            busy = r.status_code == 409  # out of order, or an earlier PUT is still being written
+        except requests.RequestException:
+            busy = True
+            if failures >= retries:
+                raise
+        if busy:
+            failures += 1
+            if failures > retries:
+                r.raise_for_status()
+            time.sleep(min(2 ** failures, 30))
+            r = requests.get(f"{BACKEND}/ingest/uploads/{upload_id}", timeout=30)
+            r.raise_for_status()
+        else:
+            failures = 0
+        offset = r.json()["offset"]
+        progress.progress(min(offset / max(uploaded.size, 1), 1.0), text=f"Uploading {offset >> 20} / {uploaded.size >> 20} MiB")
+    progress.progress(1.0, text="Indexing")
+    r = requests.post(f"{BACKEND}/ingest/uploads/{upload_id}/complete", timeout=600)
+    sessions.pop(key, None)
+    return r
+
+
 if uploaded and st.button("Ingest"):
-    files = {"file": (uploaded.name, uploaded.getvalue(), "application/pdf")}
-    r = requests.post(f"{BACKEND}/ingest/", files=files, timeout=600)
-    if r.ok:
-        payload = r.json()
-        st.session_state.doc_id = payload["doc_id"]
-        st.success(f"Ingested. doc_id={payload['doc_id']} pages={payload['pages']}")
+    try:
+        r = upload_resumable(uploaded)
+    except requests.RequestException as e:
+        st.error(f"Upload interrupted ({e}); click Ingest again to resume.")
     else:
-        st.error(r.text)
+        if r.ok:
+            payload = r.json()
+            st.session_state.doc_id = payload["doc_id"]
+            note = " (already indexed)" if payload.get("cached") else ""
+            st.success(f"Ingested{note}. doc_id={payload['doc_id']} pages={payload['pages']}")
+            if payload.get("parent_doc_id"):
+                st.info(f"Near-duplicate of {payload['parent_doc_id']} "
+                        f"(similarity {payload['similarity']:.2f}): reused {payload['reused_chunks']} chunks, "
+                        f"embedded {payload['embedded_chunks']}.")
+        else:
+            st.error(r.text)
 
 st.header("2) Ask Questions (with citations)")
 col1, col2 = st.columns([2,1])